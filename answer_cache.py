@@ -0,0 +1,164 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from intent_router import fold_token
+
+# Words that do not change what is being asked ("what's my quiz score" == "quiz score").
+# Interrogatives (when/which/how/who/where, much/many) stay: they change the question.
+STOPWORDS = frozenset("""
+a an the is are am was were be been my me i im you your do does did can could would
+will should please tell show give what whats
+s of for to in on at about have has had any there this that it its and or know let
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+
+
+def normalize_question(question) -> str:
+    """Lowercase, strip punctuation and filler words, fold plurals; word order is kept"""
+    return " ".join(fold_token(w) for w in _WORD_RE.findall(question.lower()) if w not in STOPWORDS)
+
+
+def entity_tokens(question) -> frozenset:
+    """Numbers and names in a question ("semester 2", "Python"), which a similar phrasing must share"""
+    tokens = _TOKEN_RE.findall(question)
+    return frozenset(
+        fold_token(token.lower()) for i, token in enumerate(tokens)
+        if any(c.isdigit() for c in token) or (i > 0 and token[0].isupper() and token.lower() not in STOPWORDS)
+    )
+
+
+def trigrams(text) -> frozenset:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def jaccard(a, b) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def slice_fingerprint(context_text) -> str:
+    """Hash of the prompt context an answer was generated from.
+
+    When the underlying profile data changes the context built from it
+    changes too, so answers cached against the old data simply stop matching.
+    """
+    return hashlib.blake2b(context_text.encode(), digest_size=12).hexdigest()
+
+
+class _Answer:
+    __slots__ = ("answer", "grams", "entities", "stored_at")
+
+    def __init__(self, answer, grams, entities, stored_at):
+        self.answer = answer
+        self.grams = grams
+        self.entities = entities
+        self.stored_at = stored_at
+
+
+class AnswerCache:
+    """Bounded LRU cache of LLM answers.
+
+    Exact tier: keyed on (student, data-slice fingerprint, normalized question).
+    Similarity tier: when `similarity` > 0, a miss is compared against other
+    answers for the same student and data slice using character-trigram
+    Jaccard similarity, so near-duplicate phrasings also count as hits;
+    numbers and names (entity_tokens) must still match exactly.
+    """
+
+    def __init__(self, max_entries=5000, ttl_seconds=86400, similarity=0.75):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+
+        self._entries = OrderedDict()  # (student_id, fingerprint, normalized) -> _Answer
+        self._buckets = {}             # (student_id, fingerprint) -> set of normalized questions
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "similar_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, student_id, fingerprint, question):
+        normalized = normalize_question(question)
+        if not normalized:
+            return None  # Nothing distinctive to match on
+        now = time.monotonic()
+        with self._lock:
+            key = (student_id, fingerprint, normalized)
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.stored_at < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry.answer
+
+            if self.similarity > 0:
+                grams = trigrams(normalized)
+                entities = entity_tokens(question)
+                best_key, best_score = None, self.similarity
+                for other in self._buckets.get((student_id, fingerprint), ()):
+                    candidate = self._entries[(student_id, fingerprint, other)]
+                    if candidate.entities != entities:
+                        continue
+                    score = jaccard(grams, candidate.grams)
+                    if score >= best_score and now - candidate.stored_at < self.ttl_seconds:
+                        best_key, best_score = (student_id, fingerprint, other), score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self._counters["similar_hits"] += 1
+                    return self._entries[best_key].answer
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, student_id, fingerprint, question, answer):
+        normalized = normalize_question(question)
+        if not normalized or not (answer or "").strip():
+            return  # an empty answer (e.g. a stream that produced nothing) is not worth serving again
+        key = (student_id, fingerprint, normalized)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = _Answer(answer, trigrams(normalized), entity_tokens(question), time.monotonic())
+            self._buckets.setdefault((student_id, fingerprint), set()).add(normalized)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+                self._counters["evictions"] += 1
+
+    def _forget(self, key):
+        student_id, fingerprint, normalized = key
+        bucket = self._buckets.get((student_id, fingerprint))
+        if bucket is not None:
+            bucket.discard(normalized)
+            if not bucket:
+                del self._buckets[(student_id, fingerprint)]
+
+    def invalidate_student(self, student_id) -> int:
+        """Drop every cached answer for one student; returns how many were dropped"""
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == student_id]
+            for key in keys:
+                del self._entries[key]
+                self._forget(key)
+            self._counters["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["similar_hits"] + self._counters["misses"]
+            served = self._counters["hits"] + self._counters["similar_hits"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity": self.similarity,
+                "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+            }
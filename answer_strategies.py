@@ -0,0 +1,154 @@
+import threading
+from context_builder import build_context
+from intent_router import (
+    ANNOUNCEMENTS, ASSIGNMENT_STATUS, FEE_STATUS, HELP_SUPPORT, LECTURES, NEWS, PROFILE,
+    QUIZ_SCORES, RAW_DETAIL, classify,
+)
+
+# === Strategies ===
+GREETING = "greeting"  # canned reply, no LLM call
+INDEXED = "indexed"    # one LLM call over the precomputed context index
+AGENT = "agent"        # JSON agent browsing the raw profile (several LLM calls)
+CACHED = "cached"      # served from the answer cache, no LLM call
+DETERMINISTIC = "deterministic"  # status question answered from the data, no LLM call
+
+# Index section each intent needs in the prompt
+INTENT_SECTIONS = {
+    FEE_STATUS: "fees",
+    ASSIGNMENT_STATUS: "assignments",
+    QUIZ_SCORES: "quizzes",
+    LECTURES: "lectures",
+    ANNOUNCEMENTS: "announcements",
+    NEWS: "news",
+    HELP_SUPPORT: "help_support",
+    PROFILE: "profile",
+}
+
+DIRECT_PROMPT = """
+You are an LMS Student Assistant. Answer the student's question using the provided information.
+
+Context:
+{context}
+
+Student Question: {question}
+
+Provide a helpful, friendly response based on the available information. If specific data isn't available, say so politely and suggest how they might get that information.
+"""
+
+
+class Route:
+    __slots__ = ("strategy", "sections", "intents")
+
+    def __init__(self, strategy, sections=(), intents=()):
+        self.strategy = strategy
+        self.sections = tuple(sections)
+        self.intents = tuple(intents)
+
+
+def route_question(question, greetings=(), mode="auto") -> Route:
+    """Cheap intent-based router deciding which strategy answers a question.
+
+    `mode` is "auto" (route per question), "indexed" (never use the agent)
+    or "agent" (the original agent-first behaviour).
+    """
+    if question.lower().strip() in greetings:
+        return Route(GREETING)
+
+    classification = classify(question)
+    intents = classification.intents
+    sections = [INTENT_SECTIONS[i] for i in intents if i in INTENT_SECTIONS]
+    if not sections:
+        # Nothing specific was asked for, so give the model every summary block
+        sections = ["profile", "quizzes", "assignments", "fees"]
+
+    if mode == AGENT:
+        return Route(AGENT, sections, intents)
+    if classification.deterministic:
+        return Route(DETERMINISTIC, sections, intents)
+    if mode == "auto" and RAW_DETAIL in intents:
+        return Route(AGENT, sections, intents)
+    return Route(INDEXED, sections, intents)
+
+
+# === Deterministic answers ===
+# Each returns (answer, supporting data) straight from the profile, no LLM call
+
+def quiz_scores_answer(model):
+    completed = model.completed_quizzes
+    answer = f"You have completed {model.quizzes_completed} out of {model.quizzes_total} quizzes."
+    if model.quiz_average is not None:
+        answer += f" Your average quiz score is {model.quiz_average:.1f}."
+    return answer, [q.to_dict() for q in completed[:5]]  # Show recent 5
+
+
+def assignment_status_answer(model):
+    pending = model.pending_assignments
+    answer = f"You have {len(pending)} pending assignments out of {model.assignments_total} total."
+    if pending:
+        upcoming = ", ".join(f"{a.title} (Due: {a.due})" for a in pending[:3])
+        answer += f" Next up: {upcoming}."
+    return answer, [a.to_dict() for a in pending[:5]]  # Show recent 5
+
+
+def fee_status_answer(model):
+    answer = f"Fee Status: {model.paid_count} paid invoices, {model.unpaid_count} unpaid invoices."
+    return answer, model.fee_invoices_dict()
+
+
+DETERMINISTIC_ANSWERS = {
+    QUIZ_SCORES: quiz_scores_answer,
+    ASSIGNMENT_STATUS: assignment_status_answer,
+    FEE_STATUS: fee_status_answer,
+}
+
+
+def build_indexed_prompt(question, ctx, sections, budget=None, retrieved=None, top_k=0):
+    """Single-shot prompt: section summaries plus the most relevant records within `budget` tokens.
+
+    `retrieved` / `top_k` limit course material to the top retrieval hits
+    (see build_context). Returns the prompt and the BuiltContext so callers
+    can report tokens saved.
+    """
+    header = [ctx.index.get("profile", "")]
+    header.extend(ctx.index.get(name, "") for name in sections if name != "profile")
+    built = build_context(ctx.records, "\n".join(line for line in header if line),
+                          question, sections, budget, retrieved=retrieved, top_k=top_k)
+    return DIRECT_PROMPT.format(context=built.text, question=question), built
+
+
+class PendingAnswer:
+    """A question that needs the LLM, with its focused prompt already built"""
+    __slots__ = ("question", "ctx", "route", "prompt", "built", "fingerprint")
+
+    def __init__(self, question, ctx, route, prompt, built, fingerprint):
+        self.question = question
+        self.ctx = ctx
+        self.route = route
+        self.prompt = prompt
+        self.built = built
+        self.fingerprint = fingerprint
+
+
+class StrategyStats:
+    """Questions answered and LLM calls spent, per strategy"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._questions = {}
+        self._llm_calls = {}
+
+    def record(self, strategy, llm_calls):
+        with self._lock:
+            self._questions[strategy] = self._questions.get(strategy, 0) + 1
+            self._llm_calls[strategy] = self._llm_calls.get(strategy, 0) + llm_calls
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                strategy: {
+                    "questions": count,
+                    "llm_calls": self._llm_calls[strategy],
+                    "llm_calls_per_question": round(self._llm_calls[strategy] / count, 3),
+                }
+                for strategy, count in self._questions.items()
+            }
@@ -1,32 +1,326 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from fetch_student_data import fetch_student_profile
-from langchain_community.agent_toolkits import JsonToolkit, create_json_agent
-from langchain_community.tools.json.tool import JsonSpec
-from langchain_groq import ChatGroq
-from langchain.schema import HumanMessage
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from fetch_student_data import async_fetch_profile_conditional, close_async_client, get_async_client, lms_breaker
+from profile_cache import ProfileCache, deep_sizeof
+from streaming import event_stream_response, sse_event, status_event, stream_tokens, wants_event_stream
+from student_context import StudentContext, build_context_index
+from student_model import encode_sections, parse_profile, section_hashes, update_model
+from context_builder import (
+    RETRIEVAL_SECTIONS, ContextStats, build_context, estimate_tokens, extract_records, refresh_records,
+)
+from retrieval_index import RetrievalIndex, course_key
+from answer_cache import AnswerCache, normalize_question, slice_fingerprint
+from answer_strategies import (
+    AGENT, CACHED, DETERMINISTIC, DETERMINISTIC_ANSWERS, GREETING, PendingAnswer, StrategyStats,
+    build_indexed_prompt, route_question,
+)
+from intent_router import classify
+from prefetch import PrefetchJob, read_student_ids, seconds_until
+from chat_sessions import ChatSession, create_session_store
+from metrics import (
+    AGENT_FALLBACKS, DEGRADED_ANSWERS, PROFILE_REFRESHES, REQUEST_ERRORS, SECTIONS_REBUILT, REQUEST_SECONDS, render as render_metrics, server_timing, span,
+    start_request_timings,
+)
+from structured_log import new_request_id, setup_logging, stop_logging
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler, Overloaded, is_rate_limited
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, attempt_timeout, deadline_scope, resilient_call
 from dotenv import load_dotenv
 import os
 import json
+import contextvars
+import time
+import asyncio
+import logging
+from functools import lru_cache
 
 load_dotenv()
+log = logging.getLogger("lms.api")
 
 # Initialize FastAPI
 app = FastAPI()
 
+@app.on_event("startup")
+async def startup():
+    setup_logging()
+    get_async_client()  # loads the HTTP transport now rather than on the first request
+    if os.getenv("WARM_LLM_STACK", "1") == "1":
+        # Off the event loop, so /health and greetings are served while it loads
+        app.state.warmup = asyncio.create_task(asyncio.to_thread(warm_llm_stack))
+    if os.getenv("PREFETCH_IDS_FILE"):
+        app.state.prefetch_schedule = asyncio.create_task(scheduled_prefetch())
+
+@app.on_event("shutdown")
+async def shutdown():
+    schedule = getattr(app.state, "prefetch_schedule", None)
+    if schedule is not None:
+        schedule.cancel()
+    await close_async_client()
+    sessions.close()
+    stop_logging()
+
+# Per-request stage breakdown as a Server-Timing header (for debugging slow requests)
+TIMING_HEADERS = os.getenv("TIMING_HEADERS", "0") == "1"
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Request latency histogram; streaming responses are timed to the first byte"""
+    timings = start_request_timings()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    REQUEST_SECONDS.observe(elapsed, request.method, path, str(response.status_code))
+    if TIMING_HEADERS:
+        response.headers["Server-Timing"] = server_timing(timings, elapsed)
+    return response
+
+# Time budget for a whole request; every LMS / LLM call gets what is left of it.
+# Clients may ask for less with an X-Request-Timeout header (seconds).
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "30"))
+
+@app.middleware("http")
+async def apply_request_deadline(request: Request, call_next):
+    seconds = REQUEST_DEADLINE
+    try:
+        seconds = min(seconds, float(request.headers.get("x-request-timeout", seconds)))
+    except ValueError:
+        pass
+    with deadline_scope(seconds):
+        return await call_next(request)
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Correlation ID for every log line of a request (client's X-Request-ID if sent)"""
+    request_id = new_request_id(request.headers.get("x-request-id"))
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # Request schema
 class QuestionRequest(BaseModel):
     student_id: str
     question: str
 
-# Groq setup
+class BatchQuestionRequest(BaseModel):
+    items: list[QuestionRequest]
+    concurrency: int = 8
+
+class PrefetchRequest(BaseModel):
+    student_ids: list[str]
+    concurrency: int = Field(10, gt=0)
+    rate: float = Field(20.0, gt=0)  # LMS fetches per second
+    retries: int = Field(3, ge=0)
+
+# Groq setup; the client (and langchain) is only loaded for the first question that needs it
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")  # set this in your environment
-llm = ChatGroq(
-    temperature=0.7,
-    model_name="llama-3.3-70b-versatile",
-    groq_api_key=GROQ_API_KEY
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+llm = None
+
+# Retries, hedging and circuit breaker for LLM calls
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # seconds per attempt (also capped by the deadline)
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "1"))
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0")) or None  # 0 = off; a hedge is a second paid call
+llm_breaker = CircuitBreaker(
+    "llm",
+    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+    reset_seconds=float(os.getenv("LLM_BREAKER_RESET", "30")),
+)
+
+# Shared admission control for every LLM call (see llm_scheduler.py). The rate
+# limits are per process: split the provider's limits across workers.
+llm_scheduler = LLMScheduler(
+    initial_limit=int(os.getenv("LLM_CONCURRENCY", "8")),
+    max_limit=int(os.getenv("LLM_MAX_CONCURRENCY", "64")),
+    queue_size=int(os.getenv("LLM_QUEUE_SIZE", "200")),
+    max_wait=float(os.getenv("LLM_QUEUE_MAX_WAIT", "10")),
+    requests_per_minute=float(os.getenv("LLM_RPM", "0")),  # 0 = no limit
+    tokens_per_minute=float(os.getenv("LLM_TPM", "0")),
+    latency_target=float(os.getenv("LLM_LATENCY_TARGET", "8")),
+)
+LLM_OUTPUT_TOKENS = int(os.getenv("LLM_OUTPUT_TOKENS", "300"))  # reply tokens charged up front
+AGENT_TOKENS = int(os.getenv("LLM_AGENT_TOKENS", "3000"))  # two agent steps over the profile JSON
+
+def get_llm():
+    """The shared chat model, created on first use"""
+    global llm
+    if llm is None:
+        from langchain_groq import ChatGroq
+        llm = ChatGroq(temperature=LLM_TEMPERATURE, model_name=LLM_MODEL, groq_api_key=GROQ_API_KEY)
+    return llm
+
+def human_message(prompt):
+    from langchain_core.messages import HumanMessage
+    return [HumanMessage(content=prompt)]
+
+def call_counter():
+    from llm_callbacks import LLMCallCounter
+    return LLMCallCounter()
+
+def warm_llm_stack():
+    """Import the LangChain modules and create the client ahead of the first question"""
+    from langchain_community.agent_toolkits import create_json_agent  # noqa: F401
+    import llm_callbacks  # noqa: F401
+    import cohort_index  # noqa: F401  (numpy)
+    get_llm()
+    load_prompt(CHAT_PROMPTS.get(CHAT_STRATEGY, CHAT_PROMPTS["formatted"]))
+
+# Student profile cache (most questions are follow-ups within a few minutes)
+profile_cache = ProfileCache(
+    ttl_seconds=float(os.getenv("PROFILE_CACHE_TTL", "300")),
+    stale_seconds=float(os.getenv("PROFILE_CACHE_STALE", "600")),
+    max_entries=int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.getenv("PROFILE_CACHE_MAX_BYTES", "0")) or None,
+    load_seconds=REQUEST_DEADLINE,
+    should_cache=lambda ctx: ctx.is_fresh,  # a degraded copy keeps the entry's original age
+    sizer=deep_sizeof,
+    on_evict=lambda student_id, ctx: retrieval_index.remove(student_id),
 )
 
+# Course / batch aggregates from every profile parsed so far (see cohort_index.py);
+# created on first use so numpy is not imported with the app
+cohorts = None
+
+def get_cohort_index():
+    global cohorts
+    if cohorts is None:
+        from cohort_index import CohortIndex
+        cohorts = CohortIndex()
+    return cohorts
+
+# "auto" routes each question, "indexed" never runs the agent, "agent" is agent-first
+ANSWER_STRATEGY = os.getenv("ANSWER_STRATEGY", "auto")
+strategy_stats = StrategyStats()
+
+# Prompt token budget for the relevance-ranked context (LLM latency grows with prompt size)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+context_stats = ContextStats()
+
+# BM25 over lecture notes, videos, announcements and news, one index per course;
+# only the RETRIEVAL_TOP_K best matches reach the prompt (0 lists them all as before)
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+retrieval_index = RetrievalIndex()
+
+def retrieve_material(ctx, question):
+    """Retrieval scores of the student's course material for `question` (None when retrieval is off)"""
+    if not RETRIEVAL_TOP_K or ctx.model is None:
+        return None
+    with span("retrieve"):
+        if not retrieval_index.has(ctx.student_id) and profile_cache.peek(ctx.student_id) is ctx:
+            # A refresh that raced an eviction of the entry it replaced
+            retrieval_index.update(ctx.student_id, course_key(ctx.model), ctx.records)
+        return retrieval_index.scores(course_key(ctx.model), question, ctx.records)
+
+# Answers keyed on the data slice they were generated from plus the normalized question
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "86400")),
+    similarity=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.75")),
+)
+
+async def load_student_context(student_id: str, retries=None) -> StudentContext:
+    """Fetch a profile and precompute its summary and context index.
+
+    A context already in the cache is revalidated instead: a 304 reuses it
+    as is, otherwise only the payload sections whose hash changed are
+    re-parsed and re-indexed.
+    """
+    previous = profile_cache.peek(student_id)
+    validators = previous.validators if previous is not None else {}
+    student_data, validators = await async_fetch_profile_conditional(student_id, **validators, retries=retries)
+    if student_data is None:
+        PROFILE_REFRESHES.inc("not_modified")
+        return previous
+    if "error" in student_data:
+        if student_data.get("unavailable") and previous is not None:
+            # LMS down or failing: keep answering from the last good copy
+            PROFILE_REFRESHES.inc("stale_fallback")
+            DEGRADED_ANSWERS.inc("lms_unavailable")
+            return StudentContext(student_id, previous.model, previous.summary, previous.index, previous.records,
+                                  validators=previous.validators, section_hashes=previous.section_hashes,
+                                  raw_sections=previous.raw_sections, degraded=student_data["error"])
+        return StudentContext(student_id, error=student_data["error"])
+
+    with span("parse"):
+        raw_sections = encode_sections(student_data)
+        hashes = section_hashes(raw_sections)
+        if previous is None:
+            changed = None
+            model = parse_profile(student_data)
+        else:
+            changed = [name for name, digest in hashes.items() if previous.section_hashes.get(name) != digest]
+            model = update_model(previous.model, student_data, changed)
+    if changed == []:
+        PROFILE_REFRESHES.inc("unchanged")
+        return StudentContext(student_id, previous.model, previous.summary, previous.index, previous.records,
+                              validators=validators, section_hashes=hashes, raw_sections=raw_sections)
+
+    with span("summary"):
+        summary = extract_summary_from_data(model)
+        index = build_context_index(model, summary)
+        if changed is None:
+            PROFILE_REFRESHES.inc("full")
+            records = extract_records(model)
+        else:
+            PROFILE_REFRESHES.inc("partial")
+            for name in changed:
+                SECTIONS_REBUILT.inc(name)
+            records = refresh_records(previous.records, model, changed)
+    with span("cohort"):
+        get_cohort_index().update(student_id, model)
+    with span("retrieval_index"):
+        retrieval_index.update(student_id, course_key(model), records)
+    return StudentContext(student_id, model, summary, index, records,
+                          validators=validators, section_hashes=hashes, raw_sections=raw_sections)
+
+async def get_student_context(student_id: str) -> StudentContext:
+    """Fetch a student's profile and derived context through the in-process cache"""
+    try:
+        return await profile_cache.aget(student_id, load_student_context)
+    except DeadlineExceeded:
+        # This request ran out of time waiting for a shared load, which carries on for the others
+        return StudentContext(student_id, error="Request error: LMS request timed out")
+
+# === Cache warmup ===
+prefetch_jobs = {}  # job_id -> PrefetchJob, most recent last
+MAX_PREFETCH_JOBS = 20
+PREFETCH_MAX_STUDENTS = int(os.getenv("PREFETCH_MAX_STUDENTS", "10000"))  # per POST /prefetch
+
+def start_prefetch(student_ids, concurrency=10, rate=20.0, retries=3) -> PrefetchJob:
+    """Warm the profile cache for many students in a background task"""
+    # The job's rate-limited retries are the only retry layer: each attempt is a single LMS call
+    job = PrefetchJob(
+        student_ids, lambda student_id: load_student_context(student_id, retries=0), profile_cache.set,
+        is_ok=lambda ctx: ctx.is_fresh,
+        concurrency=concurrency, rate=rate, retries=retries,
+    )
+    # A fresh context: the job outlives the request that started it, so it must not
+    # inherit that request's deadline, request ID or span timings
+    job.task = asyncio.create_task(job.run(), context=contextvars.Context())
+    prefetch_jobs[job.job_id] = job
+    for old_id in list(prefetch_jobs)[:-MAX_PREFETCH_JOBS]:
+        if prefetch_jobs[old_id].state not in ("pending", "running"):
+            del prefetch_jobs[old_id]
+    return job
+
+async def scheduled_prefetch():
+    """Prefetch PREFETCH_IDS_FILE daily at PREFETCH_AT (HH:MM), or once at startup if unset"""
+    at = os.getenv("PREFETCH_AT")
+    while True:
+        if at:
+            await asyncio.sleep(seconds_until(at))
+        student_ids = read_student_ids(os.environ["PREFETCH_IDS_FILE"], os.getenv("PREFETCH_BATCH"))
+        job = start_prefetch(
+            student_ids,
+            concurrency=int(os.getenv("PREFETCH_CONCURRENCY", "10")),
+            rate=float(os.getenv("PREFETCH_RATE", "20")),
+        )
+        await job.task
+        if not at:
+            return
+
 # Enhanced LMS Assistant Prompt
 LMS_ASSISTANT_PROMPT = """
 You are a helpful LMS Student Assistant. Answer student questions using their academic data.
@@ -49,225 +343,633 @@ Important data categories you may find:
 
 Be conversational and helpful while staying focused on academic assistance."""
 
-def extract_summary_from_data(student_data):
+# Canned replies for greetings that never need the LLM
+SIMPLE_RESPONSES = {
+    "hello": "Hello! I'm your LMS Student Assistant. I can help you with questions about your courses, grades, assignments, fees, and academic progress. What would you like to know?",
+    "hi": "Hi there! I'm here to help you with your academic information. You can ask me about your quiz scores, assignment deadlines, course details, or fee status. How can I assist you?",
+    "hey": "Hey! I'm your academic assistant. Feel free to ask about your grades, upcoming assignments, course progress, or any other academic questions.",
+    "help": "I'm here to help! You can ask me about:\n\n📚 Your quiz scores and grades\n📝 Assignment deadlines and submissions\n💰 Fee payment status\n📋 Course information\n📢 Announcements and news\n\nWhat would you like to know?"
+}
+
+def extract_summary_from_data(model):
     """Extract key information for context"""
+    summary = {}
+
+    # Basic profile info
+    if model.profile:
+        summary['name'] = model.profile.name
+        summary['course'] = model.profile.course_name or 'N/A'
+        summary['batch'] = model.profile.batch_name or 'N/A'
+
+    # Academic summary
+    summary['assignments'] = f"{model.assignments_completed}/{model.assignments_total} completed"
+    avg_score = model.quiz_average or 0
+    summary['quizzes'] = f"{model.quizzes_completed}/{model.quizzes_total} completed, avg: {avg_score:.1f}"
+
+    # Fee status
+    summary['fees'] = f"{model.paid_count} paid, {model.unpaid_count} unpaid"
+    return summary
+
+def degraded_answer(question, ctx):
+    """Answer from the data alone when the LLM is unavailable"""
+    route = route_question(question)
+    for intent in route.intents:
+        if intent in DETERMINISTIC_ANSWERS:
+            return DETERMINISTIC_ANSWERS[intent](ctx.model)[0]
+    summary = ctx.summary or extract_summary_from_data(ctx.model)
+    lines = [f"- {label}: {summary[key]}" for key, label in (
+        ("name", "Name"), ("course", "Course"), ("batch", "Batch"), ("assignments", "Assignments"),
+        ("quizzes", "Quizzes"), ("fees", "Fees")) if key in summary]
+    return ("I can't look into that in detail right now, but here is a summary of your current records:\n"
+            + "\n".join(lines))
+
+async def generate_direct_answer(prompt, callbacks=None, priority=INTERACTIVE):
+    """Generate answer with a single LLM call over the prepared prompt; None on failure"""
+    async def attempt():
+        try:
+            return await get_llm().ainvoke(human_message(prompt), config={"callbacks": callbacks or []})
+        except Exception as e:
+            if is_rate_limited(e):
+                llm_scheduler.rate_limited()
+            raise
+
     try:
-        summary = {}
-        
-        # Basic profile info
-        if 'profile' in student_data:
-            profile = student_data['profile']
-            summary['name'] = f"{profile.get('first_name', '')} {profile.get('last_name', '')}"
-            summary['course'] = profile.get('course_name', 'N/A')
-            summary['batch'] = profile.get('batch_name', 'N/A')
-        
-        # Academic summary
-        if 'lms' in student_data:
-            lms = student_data['lms']
-            
-            # Assignment summary
-            if 'assignments' in lms:
-                total_assignments = lms['assignments'].get('count', 0)
-                completed_assignments = sum(1 for a in lms['assignments'].get('data', []) 
-                                         if a.get('obtain_marks') is not None)
-                summary['assignments'] = f"{completed_assignments}/{total_assignments} completed"
-            
-            # Quiz summary
-            if 'quizzes' in lms:
-                total_quizzes = lms['quizzes'].get('count', 0)
-                completed_quizzes = sum(1 for q in lms['quizzes'].get('data', []) 
-                                     if q.get('obtained_marks') is not None)
-                quiz_scores = [int(q['obtained_marks']) for q in lms['quizzes'].get('data', []) 
-                             if q.get('obtained_marks') is not None and q['obtained_marks'].isdigit()]
-                avg_score = sum(quiz_scores) / len(quiz_scores) if quiz_scores else 0
-                summary['quizzes'] = f"{completed_quizzes}/{total_quizzes} completed, avg: {avg_score:.1f}"
-        
-        # Fee status
-        if 'fee_invoices' in student_data:
-            paid = student_data['fee_invoices']['paid_invoices'].get('total', 0)
-            unpaid = student_data['fee_invoices']['unpaid_invoices'].get('total', 0)
-            summary['fees'] = f"{paid} paid, {unpaid} unpaid"
-        
-        return summary
-    except Exception:
-        return {}
-
-def generate_direct_answer(question, student_data, summary):
-    """Generate answer using direct LLM approach with context"""
-    
-    # Create focused context based on question type
-    context_parts = [f"Student: {summary.get('name', 'N/A')}"]
-    context_parts.append(f"Course: {summary.get('course', 'N/A')}")
-    
-    question_lower = question.lower()
-    
-    # Add relevant context based on question
-    if any(word in question_lower for word in ['grade', 'score', 'mark', 'quiz', 'test']):
-        context_parts.append(f"Quiz Performance: {summary.get('quizzes', 'No quiz data')}")
-        context_parts.append(f"Assignments: {summary.get('assignments', 'No assignment data')}")
-        
-        # Add specific quiz/assignment details
-        if 'lms' in student_data:
-            recent_quizzes = []
-            for quiz in student_data['lms'].get('quizzes', {}).get('data', [])[:3]:
-                if quiz.get('obtained_marks'):
-                    recent_quizzes.append(f"{quiz['title']}: {quiz['obtained_marks']}/{quiz['marks']}")
-            if recent_quizzes:
-                context_parts.append(f"Recent Quiz Scores: {', '.join(recent_quizzes)}")
-    
-    elif any(word in question_lower for word in ['assignment', 'homework', 'submit']):
-        context_parts.append(f"Assignments: {summary.get('assignments', 'No assignment data')}")
-        
-        # Add upcoming assignments
-        if 'lms' in student_data:
-            upcoming = []
-            for assignment in student_data['lms'].get('assignments', {}).get('data', [])[:3]:
-                if assignment.get('obtain_marks') is None:  # Not submitted
-                    upcoming.append(f"{assignment['add_title']} (Due: {assignment['submission_date']})")
-            if upcoming:
-                context_parts.append(f"Pending Assignments: {', '.join(upcoming)}")
-    
-    elif any(word in question_lower for word in ['fee', 'payment', 'invoice', 'paid']):
-        context_parts.append(f"Fee Status: {summary.get('fees', 'No fee data')}")
-    
-    elif any(word in question_lower for word in ['course', 'class', 'batch']):
-        context_parts.append(f"Batch: {summary.get('batch', 'N/A')}")
-    
-    # Create prompt
-    context = " | ".join(context_parts)
-    
-    prompt = f"""
-You are an LMS Student Assistant. Answer the student's question using the provided information.
-
-Context: {context}
-
-Student Question: {question}
-
-Provide a helpful, friendly response based on the available information. If specific data isn't available, say so politely and suggest how they might get that information.
-    """
-    
-    try:
-        response = llm.invoke([HumanMessage(content=prompt)])
+        async with llm_scheduler.slot(priority, estimate_tokens(prompt) + LLM_OUTPUT_TOKENS):
+            response = await resilient_call(attempt, llm_breaker, LLM_RETRIES, timeout=LLM_TIMEOUT,
+                                            hedge_after=LLM_HEDGE_AFTER, name="llm")
         return response.content
-    except Exception as e:
-        return f"I'm having trouble processing your question about '{question}'. Please try rephrasing it or contact your instructor for assistance."
+    except (CircuitOpenError, DeadlineExceeded, Overloaded) as e:
+        log.info("direct LLM call skipped", extra={"reason": getattr(e, "reason", type(e).__name__)})
+        return None
+    except Exception:
+        log.warning("direct LLM call failed", exc_info=True)
+        return None
 
-@app.post("/ask")
-def ask_student_question(req: QuestionRequest):
+async def run_json_agent(question, ctx, callbacks=None, priority=INTERACTIVE):
+    """Let the JSON agent browse the raw profile; returns None if it gives up"""
+    if llm_breaker.is_open():
+        AGENT_FALLBACKS.inc("circuit_open")
+        return None
     try:
-        # Fetch student data
-        student_data = fetch_student_profile(req.student_id)
-        
-        if "error" in student_data:
-            raise HTTPException(status_code=400, detail=student_data["error"])
-        
-        # Handle simple greetings directly
-        simple_responses = {
-            "hello": "Hello! I'm your LMS Student Assistant. I can help you with questions about your courses, grades, assignments, fees, and academic progress. What would you like to know?",
-            "hi": "Hi there! I'm here to help you with your academic information. You can ask me about your quiz scores, assignment deadlines, course details, or fee status. How can I assist you?",
-            "hey": "Hey! I'm your academic assistant. Feel free to ask about your grades, upcoming assignments, course progress, or any other academic questions.",
-            "help": "I'm here to help! You can ask me about:\n\n📚 Your quiz scores and grades\n📝 Assignment deadlines and submissions\n💰 Fee payment status\n📋 Course information\n📢 Announcements and news\n\nWhat would you like to know?"
-        }
-        
-        question_lower = req.question.lower().strip()
-        if question_lower in simple_responses:
-            return {"answer": simple_responses[question_lower]}
-        
-        # Extract summary for better context
-        summary = extract_summary_from_data(student_data)
-        
-        # Try JSON agent approach first
-        try:
-            json_spec = JsonSpec(dict_=student_data, max_value_length=3000)
+        with span("agent_build"):
+            from langchain_community.agent_toolkits import JsonToolkit, create_json_agent
+            from langchain_community.tools.json.tool import JsonSpec
+            json_spec = JsonSpec(dict_=ctx.raw_profile(), max_value_length=3000)
             toolkit = JsonToolkit(spec=json_spec)
-            
+
             agent = create_json_agent(
-                llm=llm, 
-                toolkit=toolkit, 
+                llm=get_llm(),
+                toolkit=toolkit,
                 verbose=False,
                 max_iterations=2,
                 handle_parsing_errors=True,
                 prefix=LMS_ASSISTANT_PROMPT
             )
-            
-            result = agent.run(req.question)
-            if result and result.strip() and len(result) > 10:
-                return {"answer": result}
+
+        async with llm_scheduler.slot(priority, AGENT_TOKENS):
+            with span("agent"):
+                response = await asyncio.wait_for(agent.ainvoke({"input": question}, config={"callbacks": callbacks}),
+                                                  attempt_timeout())
+        result = response.get("output")
+        if result and result.strip() and len(result) > 10:
+            return result
+        AGENT_FALLBACKS.inc("empty")
+    except Overloaded:
+        AGENT_FALLBACKS.inc("overloaded")
+    except Exception as e:
+        if is_rate_limited(e):
+            llm_scheduler.rate_limited()
+        AGENT_FALLBACKS.inc("error")  # Caller falls back to the direct approach
+        log.warning("json agent failed, falling back to a direct answer", exc_info=True)
+    return None
+
+async def stream_llm_answer(prompt, fallback, on_done=None, callbacks=None):
+    """SSE token events for an LLM answer.
+
+    `fallback()` is sent instead while the LLM breaker is open or the
+    scheduler sheds the call; `callbacks` then see no LLM call.
+    """
+    try:
+        await llm_scheduler.acquire(INTERACTIVE, estimate_tokens(prompt) + LLM_OUTPUT_TOKENS)
+    except Overloaded:
+        allowed = False
+    else:
+        allowed = llm_breaker.allow()
+        if not allowed:
+            llm_scheduler.release(0.0, False)
+    if not allowed:
+        DEGRADED_ANSWERS.inc("llm_unavailable")
+        answer = fallback()
+        yield sse_event("token", {"text": answer})
+        yield sse_event("done", {"answer": answer})
+        return
+    finished = []
+
+    def done(answer):
+        if not answer.strip():
+            return  # an empty stream counts as a failed call and is not remembered
+        finished.append(answer)
+        if on_done is not None:
+            on_done(answer)
+
+    def failed(error):
+        if is_rate_limited(error):
+            llm_scheduler.rate_limited()
+
+    start = time.monotonic()
+    try:
+        config = {"callbacks": callbacks or [call_counter()]}
+        async for event in stream_tokens(get_llm(), human_message(prompt), on_done=done, config=config,
+                                         timeout=LLM_TIMEOUT, on_error=failed):
+            yield event
+    finally:
+        llm_scheduler.release(time.monotonic() - start, bool(finished))
+    if finished:
+        llm_breaker.record_success()
+    else:
+        llm_breaker.record_failure()
+
+def plan_answer(question, ctx, mode=None):
+    """Answer without the LLM when possible.
+
+    `mode` overrides ANSWER_STRATEGY for this question. Returns
+    (answer, None), or (None, PendingAnswer) when an LLM call is needed.
+    """
+    with span("route"):
+        route = route_question(question, SIMPLE_RESPONSES, mode or ANSWER_STRATEGY)
+    if route.strategy == GREETING:
+        strategy_stats.record(GREETING, 0)
+        return SIMPLE_RESPONSES[question.lower().strip()], None
+    if route.strategy == DETERMINISTIC:
+        strategy_stats.record(DETERMINISTIC, 0)
+        answer, _ = DETERMINISTIC_ANSWERS[route.intents[0]](ctx.model)
+        return answer, None
+
+    with span("context"):
+        prompt, built = build_indexed_prompt(question, ctx, route.sections, CONTEXT_TOKEN_BUDGET,
+                                             retrieve_material(ctx, question), RETRIEVAL_TOP_K)
+        fingerprint = slice_fingerprint(built.text)
+        cached = answer_cache.get(ctx.student_id, fingerprint, question)
+    if cached is not None:
+        strategy_stats.record(CACHED, 0)
+        return cached, None
+    return None, PendingAnswer(question, ctx, route, prompt, built, fingerprint)
+
+def finish_answer(pending, answer, llm_calls):
+    """Record stats and cache the LLM's answer; the apology text if it failed"""
+    strategy_stats.record(pending.route.strategy, llm_calls)
+    if answer is None:
+        DEGRADED_ANSWERS.inc("llm_unavailable")
+        return degraded_answer(pending.question, pending.ctx)
+    answer_cache.set(pending.ctx.student_id, pending.fingerprint, pending.question, answer)
+    return answer
+
+async def answer_question(question, ctx):
+    """Route a question to the cheapest strategy that can answer it"""
+    answer, pending = plan_answer(question, ctx)
+    if pending is None:
+        return answer
+
+    counter = call_counter()
+    if pending.route.strategy == AGENT:
+        answer = await run_json_agent(question, ctx, callbacks=[counter])
+    if answer is None:
+        # Single-shot approach with focused context (also the agent fallback)
+        context_stats.record(pending.built)
+        answer = await generate_direct_answer(pending.prompt, callbacks=[counter])
+    return finish_answer(pending, answer, counter.calls)
+
+# === Batch answering ===
+ASK_BATCH_MAX_ITEMS = int(os.getenv("ASK_BATCH_MAX_ITEMS", "500"))
+ASK_BATCH_MAX_CONCURRENCY = int(os.getenv("ASK_BATCH_MAX_CONCURRENCY", "32"))
+
+async def batched_llm_call(prompts, concurrency, counter):
+    """One answer (None on failure) per prompt, at most `concurrency` in flight.
+
+    The calls queue at batch priority, so interactive questions are
+    served first while the LLM is the bottleneck.
+    """
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(prompt):
+        async with limit:
+            return await generate_direct_answer(prompt, callbacks=[counter], priority=BATCH)
+
+    return await asyncio.gather(*(one(prompt) for prompt in prompts))
+
+async def answer_batch(items, concurrency):
+    """Answer many (student, question) items with one profile load per student.
+
+    Greetings, status questions and cached answers need no LLM call.
+    Identical questions about the same data slice share one call. Agent
+    routes run with bounded concurrency, and single-shot prompts go out
+    at most `concurrency` at a time behind interactive traffic. Results
+    keep input order, and a failed item gets an `error` instead of an
+    `answer`.
+    """
+    limit = asyncio.Semaphore(concurrency)
+    results = [{"student_id": item.student_id, "question": item.question} for item in items]
+    counter = call_counter()
+    agent_calls = 0
+
+    async def load(student_id):
+        async with limit:
+            return await get_student_context(student_id)
+
+    student_ids = list(dict.fromkeys(item.student_id for item in items))
+    loaded = await asyncio.gather(*(load(student_id) for student_id in student_ids), return_exceptions=True)
+    contexts = dict(zip(student_ids, loaded))
+
+    direct = {}  # (student, data slice, normalized question) -> [pending, item indexes, llm calls so far]
+    agent_items = []
+    for i, item in enumerate(items):
+        ctx = contexts[item.student_id]
+        if isinstance(ctx, Exception):
+            log.error("batch profile load failed", exc_info=ctx, extra={"student_id": item.student_id})
+            results[i]["error"] = "Could not load the student profile"
+            continue
+        if ctx.error:
+            results[i]["error"] = ctx.error
+            continue
+        try:
+            answer, pending = plan_answer(item.question, ctx)
         except Exception:
-            pass  # Fall back to direct approach
+            log.exception("batch item failed", extra={"student_id": item.student_id})
+            results[i]["error"] = "Could not process this question"
+            continue
+        if pending is None:
+            results[i]["answer"] = answer
+        elif pending.route.strategy == AGENT:
+            agent_items.append((i, pending))
+        else:
+            key = (item.student_id, pending.fingerprint, normalize_question(item.question) or item.question)
+            direct.setdefault(key, [pending, [], 0])[1].append(i)
+
+    async def run_agent(i, pending):
+        nonlocal agent_calls
+        agent_counter = call_counter()
+        async with limit:
+            answer = await run_json_agent(pending.question, pending.ctx, callbacks=[agent_counter], priority=BATCH)
+        agent_calls += agent_counter.calls
+        if answer is None:
+            direct[("agent", i)] = [pending, [i], agent_counter.calls]
+        else:
+            results[i]["answer"] = finish_answer(pending, answer, agent_counter.calls)
+
+    await asyncio.gather(*(run_agent(i, pending) for i, pending in agent_items))
+
+    batch = list(direct.values())
+    if batch:
+        for pending, _, _ in batch:
+            context_stats.record(pending.built)
+        answers = await batched_llm_call([pending.prompt for pending, _, _ in batch], concurrency, counter)
+        for (pending, indexes, calls), answer in zip(batch, answers):
+            answer = finish_answer(pending, answer, calls + 1)
+            for n, i in enumerate(indexes):
+                if n:
+                    strategy_stats.record(CACHED, 0)  # shared the first item's call
+                results[i]["answer"] = answer
+
+    return {"results": results, "students": len(student_ids), "llm_calls": agent_calls + counter.calls}
+
+@app.post("/ask")
+async def ask_student_question(req: QuestionRequest):
+    try:
+        # Fetch student data
+        ctx = await get_student_context(req.student_id)
+        
+        if ctx.error:
+            raise HTTPException(status_code=400, detail=ctx.error)
         
-        # Fallback: Direct approach with focused context
-        direct_answer = generate_direct_answer(req.question, student_data, summary)
-        return {"answer": direct_answer}
+        return {"answer": await answer_question(req.question, ctx)}
         
     except HTTPException:
         raise
     except Exception as e:
+        REQUEST_ERRORS.inc("/ask")
+        log.exception("failed to answer question", extra={"student_id": req.student_id})
         return {
             "answer": f"I'm experiencing some technical difficulties while processing your question: '{req.question}'. Please try asking in a different way, or contact your system administrator if the issue continues."
         }
 
+@app.post("/ask/batch")
+async def ask_student_questions_batch(req: BatchQuestionRequest):
+    """Answer many questions for one or many students in a single request"""
+    if len(req.items) > ASK_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {ASK_BATCH_MAX_ITEMS} items per batch")
+    concurrency = max(1, min(req.concurrency, ASK_BATCH_MAX_CONCURRENCY))
+    return await answer_batch(req.items, concurrency)
+
+@app.post("/ask/stream")
+async def ask_student_question_stream(req: QuestionRequest):
+    """Stream the answer as Server-Sent Events: status updates, then tokens"""
+
+    async def events():
+        ctx = await get_student_context(req.student_id)
+        if ctx.error:
+            yield sse_event("error", {"message": ctx.error})
+            return
+        yield status_event("profile loaded")
+
+        # Agent steps cannot be streamed, so streaming always answers single-shot
+        answer, pending = plan_answer(req.question, ctx, mode="indexed")
+        if pending is None:
+            yield sse_event("token", {"text": answer})
+            yield sse_event("done", {"answer": answer})
+            return
+
+        context_stats.record(pending.built)
+        yield status_event("context built")
+
+        counter = call_counter()
+        on_done = lambda answer: answer_cache.set(ctx.student_id, pending.fingerprint, req.question, answer)
+        try:
+            async for event in stream_llm_answer(pending.prompt, lambda: degraded_answer(req.question, ctx),
+                                                 on_done, callbacks=[counter]):
+                yield event
+        finally:
+            # Counted once the call happened, so shed and breaker-open fallbacks record none
+            strategy_stats.record(pending.route.strategy, counter.calls)
+
+    return event_stream_response(events())
+
+# === Chat ===
+# How /chat puts the profile in front of the LLM: "raw" dumps the profile fields, "formatted"
+# renders a readable profile card, "agent" lets the JSON agent browse the profile.
+# The request body may pick another one per call with "strategy".
+CHAT_STRATEGY = os.getenv("CHAT_STRATEGY", "formatted")
+CHAT_STRATEGIES = ("raw", "formatted", "agent")
+CHAT_PROMPTS = {"raw": "prompt_template1.txt", "formatted": "prompt_template.txt"}
+CHAT_PROFILE_TTL = float(os.getenv("CHAT_PROFILE_TTL", "300"))  # seconds a session reuses its profile text
+CHAT_RECENT_TURNS = int(os.getenv("CHAT_RECENT_TURNS", "4"))  # turns kept verbatim, older ones are summarized
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "200"))  # budget for the rolling summary
+sessions = create_session_store(
+    os.getenv("CHAT_SESSION_BACKEND", "memory"),  # "sqlite" keeps sessions across restarts
+    os.getenv("CHAT_SESSION_DB_PATH", "chat_sessions.db"),
+    float(os.getenv("CHAT_SESSION_TTL", "1800")),
+)
+
+@lru_cache(maxsize=None)
+def load_prompt(filename):
+    """Compile a prompt file next to this module once"""
+    from langchain_core.prompts import PromptTemplate
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), filename), encoding="utf-8") as f:
+        return PromptTemplate.from_template(f.read())
+
+def profile_header(model) -> str:
+    profile = model.profile
+    if profile is None:
+        return ""
+    return "\n".join([
+        "🧑‍🎓 Basic Profile:",
+        f"Name: {profile.name}",
+        f"Email: {profile.email or 'N/A'}",
+        f"Gender: {profile.gender or 'N/A'}",
+        f"Date of Birth: {profile.date_of_birth or 'N/A'}",
+        f"City: {profile.city or 'N/A'}",
+        f"Course: {profile.course_name or 'N/A'}",
+        f"Batch: {profile.batch_name or 'N/A'}",
+        f"Branch: {profile.branch_name or 'N/A'}",
+    ])
+
+def format_profile(ctx, strategy, question="") -> str:
+    """Profile text for a chat prompt: a header plus the records most relevant to `question`.
+
+    With retrieval on, course material is left out; chat_prompt adds the
+    hits for each turn's question instead.
+    """
+    if strategy == "raw":
+        header = f"profile: {ctx.model.profile.to_dict() if ctx.model.profile else {}}"
+    else:
+        header = profile_header(ctx.model)
+    sections = route_question(question).sections if question else ()
+    built = build_context(ctx.records, header, question, sections, CONTEXT_TOKEN_BUDGET,
+                          retrieved={} if RETRIEVAL_TOP_K else None)
+    context_stats.record(built)
+    return built.text
+
+def course_material(ctx, question) -> str:
+    """The student's lecture notes, videos, announcements and news that best match `question`"""
+    retrieved = retrieve_material(ctx, question)
+    if retrieved is None:
+        return ""
+    material = [r for r in ctx.records if r.section in RETRIEVAL_SECTIONS]
+    return build_context(material, question=question, retrieved=retrieved, top_k=RETRIEVAL_TOP_K).text
+
+async def load_session(student_id, session_id, strategy):
+    """The conversation plus the profile text reused across its turns.
+
+    Returns (session, ctx, profile_text); a failed fetch is reported in the
+    profile text and not stored, so the next turn retries it.
+    """
+    session = await sessions.aget(student_id, session_id)
+    if session is None:
+        session = ChatSession(session_id, student_id)
+    ctx = await get_student_context(student_id)
+    if ctx.error:
+        return session, ctx, f"Error fetching student profile: {ctx.error}"
+    if strategy != CHAT_STRATEGY:
+        return session, ctx, format_profile(ctx, strategy)  # one-off override, keep the session's text
+    if not session.profile_is_fresh(CHAT_PROFILE_TTL):
+        session.set_profile(format_profile(ctx, strategy))
+    return session, ctx, session.profile_text
+
+async def remember_turn(session, question, reply):
+    session.add_turn(question, reply, CHAT_RECENT_TURNS, CHAT_SUMMARY_TOKENS)
+    await sessions.aput(session)
+
+def chat_prompt(session, ctx, profile_text, question, strategy) -> str:
+    material = course_material(ctx, question)
+    if material:
+        profile_text = f"{profile_text}\n{material}"
+    return load_prompt(CHAT_PROMPTS.get(strategy, CHAT_PROMPTS["formatted"])).format(
+        student_profile=profile_text, history=session.history_text(), input=question)
+
+async def chat_reply(session, ctx, profile_text, question, strategy) -> str:
+    if strategy == "agent" and not ctx.error:
+        history = session.history_text() if session.turns or session.summary else ""
+        reply = await run_json_agent(f"{history}\n\nStudent question: {question}" if history else question,
+                                     ctx, callbacks=[call_counter()])
+        if reply is not None:
+            return reply
+        profile_text = format_profile(ctx, "formatted", question)
+    reply = await generate_direct_answer(chat_prompt(session, ctx, profile_text, question, strategy),
+                                         callbacks=[call_counter()])
+    if reply is None:
+        if ctx.error:
+            raise RuntimeError("LLM call failed")
+        DEGRADED_ANSWERS.inc("llm_unavailable")
+        return degraded_answer(question, ctx)
+    return reply
+
+async def stream_chat_reply(student_id, session_id, question, strategy):
+    """SSE events for one chat turn: status updates followed by streamed tokens"""
+    session, ctx, profile_text = await load_session(student_id, session_id, strategy)
+    yield status_event("profile loaded")
+    if strategy == "agent" and not ctx.error:
+        # Agent steps cannot be streamed, so streaming answers from the formatted profile
+        profile_text = format_profile(ctx, "formatted", question)
+    prompt = chat_prompt(session, ctx, profile_text, question, strategy)
+    yield status_event("context built")
+    replies = []
+    fallback = lambda: degraded_answer(question, ctx) if ctx.model is not None else profile_text
+    async for event in stream_llm_answer(prompt, fallback, replies.append):
+        if replies:
+            await remember_turn(session, question, replies.pop())  # saved before `done` goes out
+        yield event
+
+@app.post("/chat/{student_id}")
+async def chat_with_student(student_id: str, request: Request):
+    body = await request.json()
+    question = body.get("message")
+    session_id = body.get("session_id") or student_id
+    strategy = body.get("strategy") or CHAT_STRATEGY
+
+    if not question:
+        return {"error": "Missing 'message' in request body"}
+    if strategy not in CHAT_STRATEGIES:
+        raise HTTPException(status_code=400, detail=f"Unknown strategy: {strategy}")
+
+    if wants_event_stream(request):
+        return event_stream_response(stream_chat_reply(student_id, session_id, question, strategy))
+
+    session, ctx, profile_text = await load_session(student_id, session_id, strategy)
+    try:
+        reply = await chat_reply(session, ctx, profile_text, question, strategy)
+    except Exception as e:
+        REQUEST_ERRORS.inc("/chat")
+        log.exception("failed to answer chat message", extra={"student_id": student_id})
+        raise HTTPException(status_code=502, detail=str(e))
+    await remember_turn(session, question, reply)
+
+    return {"reply": reply, "session_id": session_id, "strategy": strategy}
+
+@app.delete("/chat/{student_id}")
+async def end_chat_session(student_id: str, session_id: str = None):
+    """Forget one of this student's conversations (their default one unless `session_id` is given)"""
+    session_id = session_id or student_id
+    return {"session_id": session_id, "deleted": await sessions.adelete(student_id, session_id)}
+
+@app.get("/chat/sessions/stats")
+async def chat_session_stats():
+    return sessions.stats()
+
+@app.get("/context/stats")
+async def context_token_stats():
+    """Prompt tokens used and saved by the relevance-pruned context, and the course material index size"""
+    return {"token_budget": CONTEXT_TOKEN_BUDGET, **context_stats.snapshot(),
+            "retrieval": {"top_k": RETRIEVAL_TOP_K, **retrieval_index.stats()}}
+
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "healthy", "service": "LMS Student Assistant"}
 
 @app.get("/student/{student_id}/summary")
-def get_student_summary(student_id: str):
+async def get_student_summary(student_id: str):
     """Get a quick summary of student's academic status"""
     try:
-        student_data = fetch_student_profile(student_id)
-        if "error" in student_data:
-            raise HTTPException(status_code=400, detail=student_data["error"])
-        
-        summary = extract_summary_from_data(student_data)
+        ctx = await get_student_context(student_id)
+        if ctx.error:
+            raise HTTPException(status_code=400, detail=ctx.error)
         
         return {
             "student_id": student_id,
-            "summary": summary,
+            "summary": ctx.summary,
+            "cohort": get_cohort_index().compare(student_id),
             "data_available": True
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/cohorts")
+async def list_cohorts(by: str = "cohort", course: str = None, batch: str = None):
+    """Aggregates per course, batch or course + batch, from the profiles fetched so far (no LMS calls)"""
+    from cohort_index import GROUP_BY
+    if by not in GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"Unknown grouping: {by} (use one of {', '.join(GROUP_BY)})")
+    return {"by": by, "groups": get_cohort_index().breakdown(by, course, batch)}
+
+@app.get("/cohorts/summary")
+async def cohort_summary(course: str = None, batch: str = None):
+    """Quiz, assignment and fee aggregates for one course and/or batch"""
+    summary = get_cohort_index().summary(course, batch)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No fetched profiles in this course / batch yet")
+    return {"course": course, "batch": batch, **summary}
+
 # Optional: Endpoint to test specific data queries
 @app.post("/query")
-def query_student_data(req: QuestionRequest):
+async def query_student_data(req: QuestionRequest):
     """Direct query endpoint for testing specific data access"""
     try:
-        student_data = fetch_student_profile(req.student_id)
-        if "error" in student_data:
-            raise HTTPException(status_code=400, detail=student_data["error"])
+        ctx = await get_student_context(req.student_id)
+        if ctx.error:
+            raise HTTPException(status_code=400, detail=ctx.error)
+        # Same intent classifier as /ask; answer the first data intent found
+        for intent in classify(req.question).intents:
+            if intent in DETERMINISTIC_ANSWERS:
+                answer, data = DETERMINISTIC_ANSWERS[intent](ctx.model)
+                return {"answer": answer, "data": data}
         
-        # Simple keyword-based data extraction
-        question_lower = req.question.lower()
-        
-        if "quiz" in question_lower or "test" in question_lower:
-            quizzes = student_data.get('lms', {}).get('quizzes', {})
-            completed = [q for q in quizzes.get('data', []) if q.get('obtained_marks')]
-            return {
-                "answer": f"You have completed {len(completed)} out of {quizzes.get('count', 0)} quizzes.",
-                "data": completed[:5]  # Show recent 5
-            }
-        
-        elif "assignment" in question_lower:
-            assignments = student_data.get('lms', {}).get('assignments', {})
-            pending = [a for a in assignments.get('data', []) if not a.get('obtain_marks')]
-            return {
-                "answer": f"You have {len(pending)} pending assignments out of {assignments.get('count', 0)} total.",
-                "data": pending[:5]  # Show recent 5
-            }
-        
-        elif "fee" in question_lower or "payment" in question_lower:
-            fees = student_data.get('fee_invoices', {})
-            paid = fees.get('paid_invoices', {}).get('total', 0)
-            unpaid = fees.get('unpaid_invoices', {}).get('total', 0)
-            return {
-                "answer": f"Fee Status: {paid} paid invoices, {unpaid} unpaid invoices.",
-                "data": fees
-            }
-        
-        else:
-            return {"answer": "Please ask about quizzes, assignments, or fees for specific data."}
+        return {"answer": "Please ask about quizzes, assignments, or fees for specific data."}
             
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/student/{student_id}/cache")
+async def invalidate_student_cache(student_id: str):
+    """Drop a student's cached profile so the next request refetches it"""
+    return {
+        "student_id": student_id,
+        "invalidated": profile_cache.invalidate(student_id),
+        "answers_dropped": answer_cache.invalidate_student(student_id),
+    }
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit, miss and eviction counters for sizing the profile and answer caches"""
+    return {"profiles": profile_cache.stats(), "answers": answer_cache.stats(), "cohorts": get_cohort_index().stats()}
+
+@app.get("/strategy/stats")
+async def answer_strategy_stats():
+    """Questions answered and LLM calls spent per answer strategy"""
+    return {
+        "mode": ANSWER_STRATEGY,
+        "strategies": strategy_stats.snapshot(),
+        "context": {"token_budget": CONTEXT_TOKEN_BUDGET, **context_stats.snapshot()},
+    }
+
+@app.get("/upstreams/stats")
+async def upstream_stats():
+    """Circuit breaker state and counters for the LMS and the LLM"""
+    return {"lms": lms_breaker.stats(), "llm": llm_breaker.stats(), "request_deadline_seconds": REQUEST_DEADLINE}
+
+@app.get("/llm/stats")
+async def llm_scheduler_stats():
+    """Concurrency limit, queue depth and shed / rate-limited counts of the LLM scheduler"""
+    return llm_scheduler.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage latency histograms and LLM, agent and upstream counters (Prometheus text format)"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.post("/prefetch")
+async def prefetch_profiles(req: PrefetchRequest):
+    """Start warming the profile cache for a list of students"""
+    if len(req.student_ids) > PREFETCH_MAX_STUDENTS:
+        raise HTTPException(status_code=413, detail=f"At most {PREFETCH_MAX_STUDENTS} students per prefetch")
+    job = start_prefetch(req.student_ids, req.concurrency, req.rate, req.retries)
+    return job.progress()
+
+@app.get("/prefetch")
+async def list_prefetch_jobs():
+    return {"jobs": [job.progress() for job in prefetch_jobs.values()]}
+
+@app.get("/prefetch/{job_id}")
+async def prefetch_progress(job_id: str):
+    """Progress and throughput of one prefetch job"""
+    job = prefetch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown prefetch job: {job_id}")
+    return job.progress()
@@ -0,0 +1,87 @@
+"""/ask/batch vs one /ask request per item, against stub backends.
+
+A class of students each asks the same few questions (the advisors'
+dashboard case). Caches are cleared between runs so both sides pay for
+every profile fetch and LLM call they need.
+
+    python benchmarks/bench_ask_batch.py --students 100 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from stubs import StubChatModel, create_stub_lms_app, free_port, serve_in_thread
+
+QUESTIONS = [
+    "How many assignments are pending?",
+    "What is my fee status?",
+    "When is the lecture on recursion?",
+    "When is the recursion lecture?",
+    "Any news this week?",
+]
+
+
+def reset(service):
+    service.profile_cache.clear()
+    service.answer_cache.clear()
+
+
+async def run_single(client, items, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        async with semaphore:
+            response = await client.post("/ask", json=item)
+            return response.status_code == 200
+
+    ok = await asyncio.gather(*(one(item) for item in items))
+    return sum(ok)
+
+
+async def run_batch(client, items, concurrency):
+    response = await client.post("/ask/batch", json={"items": items, "concurrency": concurrency})
+    return sum(1 for result in response.json()["results"] if "answer" in result)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--lms-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    lms = create_stub_lms_app(latency=args.lms_latency)
+    port = free_port()
+    serve_in_thread(lms, port)
+    os.environ["STUDENT_API_BASE"] = f"http://127.0.0.1:{port}/api/student-profile"
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+
+    import app as service
+    service.llm = StubChatModel(latency=args.llm_latency)
+    items = [{"student_id": str(3000 + s), "question": q} for s in range(args.students) for q in QUESTIONS]
+    print(f"{len(items)} items: {args.students} students x {len(QUESTIONS)} questions, "
+          f"concurrency={args.concurrency}, lms={args.lms_latency}s llm={args.llm_latency}s")
+
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        for label, run in (("/ask x N", run_single), ("/ask/batch", run_batch)):
+            reset(service)
+            upstream, llm_calls = lms.state.requests, service.llm.calls
+            start = time.perf_counter()
+            answered = await run(client, items, args.concurrency)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<11} {elapsed:7.2f}s  {len(items) / elapsed:7.1f} items/s  answered={answered}  "
+                  f"profile fetches={lms.state.requests - upstream}  llm calls={service.llm.calls - llm_calls}")
+    await service.close_async_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""Cohort aggregates from the index vs fetching every student.
+
+Without the index, "average quiz score per batch" means pulling every
+student's profile from the LMS and aggregating them. With it, the
+profiles fetched for questions or by a prefetch have already updated the
+per-cohort columns, and GET /cohorts answers from memory. The script
+warms the index with a prefetch, checks it agrees with a full
+fetch-and-aggregate, and times both.
+
+    python benchmarks/bench_cohorts.py --students 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from stubs import StubChatModel, create_stub_lms_app, free_port, make_profile, percentile, serve_in_thread
+
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import app as service
+import fetch_student_data as fetch
+from student_model import parse_profile
+from structured_log import setup_logging, stop_logging
+
+
+async def fetch_and_aggregate(student_ids, concurrency):
+    """The no-index way: fetch every profile, then average quiz scores per batch"""
+    limit = asyncio.Semaphore(concurrency)
+    scores = {}
+
+    async def one(student_id):
+        async with limit:
+            data, _ = await fetch.async_fetch_profile_conditional(student_id)
+        model = parse_profile(data)
+        if model.quiz_average is not None:
+            scores.setdefault(model.profile.batch_name, []).append(model.quiz_average)
+
+    await asyncio.gather(*(one(student_id) for student_id in student_ids))
+    return {batch: statistics.fmean(values) for batch, values in scores.items()}
+
+
+async def time_endpoint(client, path, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        response = await client.get(path)
+        latencies.append(time.perf_counter() - start)
+    return response.json(), latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--lms-latency", type=float, default=0.02)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_logging()
+    lms = create_stub_lms_app(latency=args.lms_latency, records=20)
+    port = free_port()
+    serve_in_thread(lms, port)
+    fetch.STUDENT_API_BASE = f"http://127.0.0.1:{port}/api/student-profile"
+    service.llm = StubChatModel(latency=0)
+    student_ids = [str(10000 + i) for i in range(args.students)]
+    print(f"students={args.students} lms latency={args.lms_latency}s concurrency={args.concurrency}")
+
+    start = time.perf_counter()
+    expected = await fetch_and_aggregate(student_ids, args.concurrency)
+    print(f"fetch every profile + aggregate:  {time.perf_counter() - start:.2f}s  "
+          f"lms requests={args.students}")
+
+    job = service.start_prefetch(student_ids, concurrency=args.concurrency, rate=10 ** 6)
+    await job.task
+    index = service.get_cohort_index()
+    stats = index.stats()
+    print(f"prefetch (fills the index too):   {job.progress()['elapsed_seconds']}s  "
+          f"cohorts={stats['cohorts']} students={stats['students']} columns={stats['bytes'] / 1024:.0f} KiB "
+          f"(profile cache holds {service.profile_cache.stats()['entries']})")
+
+    models = [parse_profile(make_profile(student_id)) for student_id in student_ids]
+    start = time.perf_counter()
+    for student_id, model in zip(student_ids, models):
+        index.update(student_id, model)
+    print(f"index update: {(time.perf_counter() - start) / len(models) * 1e6:.1f} us per profile")
+
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+        before = lms.state.requests
+        for path in ("/cohorts?by=batch", "/cohorts", "/cohorts/summary?course=Data%20Science",
+                     f"/student/{student_ids[0]}/summary"):
+            body, latencies = await time_endpoint(client, path, args.calls)
+            print(f"  GET {path:<40} p50={percentile(latencies, 50) * 1000:.2f}ms "
+                  f"p99={percentile(latencies, 99) * 1000:.2f}ms")
+            if path == "/cohorts?by=batch":
+                by_batch = {group["batch"]: group["quiz_average"]["mean"] for group in body["groups"]}
+        print(f"  lms requests while serving: {lms.state.requests - before}")
+
+    mismatches = [batch for batch, mean in expected.items() if abs(by_batch.get(batch, -1) - mean) > 0.01]
+    print("per-batch quiz averages match the full fetch" if not mismatches else f"MISMATCH: {mismatches}")
+    await fetch.close_async_client()
+    stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""Concurrency benchmark for the async request path.
+
+Starts a stub LMS server and swaps the Groq client for a stub LLM, then
+fires many concurrent questions from distinct students and reports
+requests-per-second and latency percentiles. The question needs the LLM
+(a quiz average alone is answered without it), and the run fails if
+the stub LLM was never called.
+
+    python benchmarks/bench_concurrency.py --students 150 --requests 600
+    python benchmarks/bench_concurrency.py --target chat   # /chat
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # the chat apps load prompt templates relative to the repo root
+
+import httpx
+
+QUESTION = "How can I improve my quiz scores?"
+
+from stubs import StubChatModel, create_stub_lms_app, free_port, percentile, serve_in_thread
+
+
+async def run_load(base_url, target, students, total, concurrency):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def one(i):
+            nonlocal errors
+            student_id = str(1000 + i % students)
+            async with semaphore:
+                start = time.perf_counter()
+                if target == "ask":
+                    response = await client.post("/ask", json={"student_id": student_id, "question": QUESTION})
+                else:
+                    response = await client.post(f"/chat/{student_id}", json={"message": QUESTION})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["ask", "chat"], default="ask")
+    parser.add_argument("--students", type=int, default=150)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=150)
+    parser.add_argument("--lms-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    lms_port = free_port()
+    serve_in_thread(create_stub_lms_app(latency=args.lms_latency), lms_port)
+    os.environ["STUDENT_API_BASE"] = f"http://127.0.0.1:{lms_port}/api/student-profile"
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+
+    import app as service
+    stub_llm = StubChatModel(latency=args.llm_latency)
+    service.llm = stub_llm
+
+    app_port = free_port()
+    serve_in_thread(service.app, app_port)
+
+    latencies, errors, elapsed = asyncio.run(
+        run_load(f"http://127.0.0.1:{app_port}", args.target, args.students, args.requests, args.concurrency)
+    )
+
+    print(f"target={args.target} students={args.students} requests={args.requests} concurrency={args.concurrency}")
+    print(f"llm latency={args.llm_latency:.3f}s  lms latency={args.lms_latency:.3f}s")
+    print(f"throughput: {len(latencies) / elapsed:.1f} req/s  errors: {errors}")
+    print(f"latency p50={percentile(latencies, 50) * 1000:.0f}ms "
+          f"p95={percentile(latencies, 95) * 1000:.0f}ms p99={percentile(latencies, 99) * 1000:.0f}ms")
+    print(f"llm calls: {stub_llm.calls}")
+    assert stub_llm.calls > 0, "no request reached the LLM; the benchmark measured the deterministic path"
+
+
+if __name__ == "__main__":
+    main()
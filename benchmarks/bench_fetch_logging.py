@@ -0,0 +1,75 @@
+"""Fetch-path overhead of response logging.
+
+Parses the same student-profile response repeatedly through
+`_parse_profile_response` and compares:
+
+  print      the old behaviour: status lines plus the pretty-printed JSON body
+  off        structured logging at INFO (debug summary skipped)
+  sampled    DEBUG with LOG_SAMPLE_RATE=0.1 (one request in ten logs)
+  debug      DEBUG for every request (bounded payload summary)
+
+Log output goes to /dev/null so only the cost paid by the request path is
+measured (the queue listener writes on its own thread).
+
+    python benchmarks/bench_fetch_logging.py --records 100 --iterations 2000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+import structured_log
+from fetch_student_data import _parse_profile_response
+
+from stubs import make_profile, percentile
+
+
+def old_print_path(response, student_id, out):
+    """The removed debug prints, reproduced for the baseline"""
+    print(f"[DEBUG] Status Code: {response.status_code}", file=out)
+    print(f"[DEBUG] Content-Type: {response.headers.get('Content-Type')}", file=out)
+    data = _parse_profile_response(response, student_id)
+    print("[DEBUG] Full JSON response:", file=out)
+    print(json.dumps(data, indent=2), file=out)
+    return data
+
+
+def run(label, fn, response, iterations):
+    samples = []
+    for i in range(iterations):
+        structured_log.new_request_id(f"bench-{i}")
+        start = time.perf_counter()
+        fn(response, str(i))
+        samples.append((time.perf_counter() - start) * 1e6)
+    print(f"{label:<8} mean={sum(samples) / len(samples):8.1f}us  p50={percentile(samples, 50):8.1f}us  "
+          f"p99={percentile(samples, 99):8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    body = json.dumps(make_profile("1001", records=args.records)).encode()
+    response = httpx.Response(200, content=body, headers={"Content-Type": "application/json"})
+    print(f"profile body: {len(body) / 1024:.1f} KB, {args.iterations} iterations")
+
+    with open(os.devnull, "w") as devnull:
+        run("print", lambda r, sid: old_print_path(r, sid, devnull), response, args.iterations)
+
+        for label, level, rate in (("off", "INFO", 1.0), ("sampled", "DEBUG", 0.1), ("debug", "DEBUG", 1.0)):
+            structured_log.setup_logging(level, rate, stream=devnull)
+            run(label, _parse_profile_response, response, args.iterations)
+            structured_log.stop_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Incremental profile refresh against a stub LMS with ETags and partial changes.
+
+Loads every student once, changes a fraction of the profiles (new
+announcements, the odd newly graded quiz), then reloads everyone:
+
+  full     cache cleared first: every profile downloaded and rebuilt
+  etag     conditional requests; unchanged profiles come back as 304
+  hashes   upstream without ETags; unchanged sections are not rebuilt
+
+Partial rebuilds are checked against a full rebuild of the same payload.
+
+    python benchmarks/bench_incremental_refresh.py --students 200 --records 100 --changed 0.1
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stubs import StubChatModel, change_profile, create_stub_lms_app, free_port, make_profile, serve_in_thread
+
+
+async def reload_all(service, student_ids, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(student_id):
+        async with semaphore:
+            ctx = await service.load_student_context(student_id)
+            service.profile_cache.set(student_id, ctx)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(load(student_id) for student_id in student_ids))
+    return time.perf_counter() - start
+
+
+def outcomes(metrics):
+    return {result: metrics.PROFILE_REFRESHES.value(result)
+            for result in ("full", "not_modified", "unchanged", "partial")}
+
+
+def delta(after, before):
+    return " ".join(f"{key}={after[key] - before[key]}" for key in after if after[key] - before[key])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--records", type=int, default=100)
+    parser.add_argument("--changed", type=float, default=0.1, help="fraction of profiles changed per round")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    lms = create_stub_lms_app(latency=0.0, records=args.records, etag=True)
+    port = free_port()
+    serve_in_thread(lms, port)
+    os.environ["STUDENT_API_BASE"] = f"http://127.0.0.1:{port}/api/student-profile"
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+
+    import app as service
+    import metrics
+    from context_builder import extract_records
+    from student_model import parse_profile
+    service.llm = StubChatModel(latency=0)
+
+    student_ids = [str(5000 + i) for i in range(args.students)]
+    await reload_all(service, student_ids, args.concurrency)
+    changed_count = max(1, int(args.students * args.changed))
+    print(f"students={args.students} records={args.records} changed per round={changed_count}")
+
+    for label, use_etag, clear in (("full", True, True), ("etag", True, False), ("hashes", False, False)):
+        for student_id in student_ids[:changed_count]:
+            lms.state.revisions[student_id] = lms.state.revisions.get(student_id, 0) + 1
+        lms.state.etag = use_etag
+        if clear:
+            service.profile_cache.clear()
+        before, requests_before, not_modified_before = outcomes(metrics), lms.state.requests, lms.state.not_modified
+        elapsed = await reload_all(service, student_ids, args.concurrency)
+        print(f"{label:<7} {elapsed * 1000:8.1f} ms  requests={lms.state.requests - requests_before} "
+              f"304s={lms.state.not_modified - not_modified_before}  {delta(outcomes(metrics), before)}")
+
+    # Partial rebuilds must match a from-scratch rebuild of the same payload
+    mismatches = 0
+    for student_id in student_ids[:changed_count]:
+        ctx = service.profile_cache.peek(student_id)
+        payload = change_profile(make_profile(student_id, records=args.records), lms.state.revisions[student_id])
+        model = parse_profile(payload)
+        if ctx.model != model or [r.text for r in ctx.records] != [r.text for r in extract_records(model)]:
+            mismatches += 1
+    rebuilt = {name: metrics.SECTIONS_REBUILT.value(name) for name in ("profile", "lms", "fee_invoices",
+                                                                     "announcements", "news", "help_support")}
+    print(f"sections rebuilt: {rebuilt}")
+    print(f"partial rebuild mismatches: {mismatches}/{changed_count}")
+    await service.close_async_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""Accuracy and speed of the shared intent classifier.
+
+Scores intent_router.classify against the labelled corpus in
+intent_corpus.jsonl, then times it against the substring keyword chains
+that /ask and /query used before.
+
+    python benchmarks/bench_intent_router.py --rounds 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from intent_router import classify
+
+
+def legacy_route(question):
+    """The old generate_direct_answer / query_student_data keyword chains"""
+    question_lower = question.lower()
+    if any(word in question_lower for word in ['grade', 'score', 'mark', 'quiz', 'test']):
+        ask = "quiz"
+    elif any(word in question_lower for word in ['assignment', 'homework', 'submit']):
+        ask = "assignment"
+    elif any(word in question_lower for word in ['fee', 'payment', 'invoice', 'paid']):
+        ask = "fee"
+    elif any(word in question_lower for word in ['course', 'class', 'batch']):
+        ask = "course"
+    else:
+        ask = None
+    if "quiz" in question_lower or "test" in question_lower:
+        query = "quiz"
+    elif "assignment" in question_lower:
+        query = "assignment"
+    elif "fee" in question_lower or "payment" in question_lower:
+        query = "fee"
+    else:
+        query = None
+    return ask, query
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def time_per_call(fn, questions, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for question in questions:
+            fn(question)
+    return (time.perf_counter() - start) / (rounds * len(questions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(HERE, "intent_corpus.jsonl"))
+    parser.add_argument("--rounds", type=int, default=1000)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    intent_hits = deterministic_hits = 0
+    for row in corpus:
+        result = classify(row["question"])
+        if set(result.intents) == set(row["intents"]):
+            intent_hits += 1
+        else:
+            print(f"MISS intents: {row['question']!r} -> {result.intents}, expected {row['intents']}")
+        if result.deterministic == row["deterministic"]:
+            deterministic_hits += 1
+        else:
+            print(f"MISS deterministic: {row['question']!r} -> {result.deterministic}")
+
+    questions = [row["question"] for row in corpus]
+    classify_us = time_per_call(classify, questions, args.rounds) * 1e6
+    legacy_us = time_per_call(legacy_route, questions, args.rounds) * 1e6
+
+    print(f"corpus: {len(corpus)} questions")
+    print(f"intent accuracy: {intent_hits / len(corpus):.1%}  deterministic-flag accuracy: {deterministic_hits / len(corpus):.1%}")
+    print(f"classify: {classify_us:.2f} us/question  legacy keyword chains: {legacy_us:.2f} us/question")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""LLM scheduler under a provider rate limit.
+
+The stub LLM accepts `--provider-limit` concurrent calls and answers the
+rest with a 429, like Groq does under exam-week load. The same burst of
+/ask questions (all needing the LLM) is sent with the scheduler
+effectively off (a fixed, very high concurrency limit) and with the
+adaptive one, and then interactive latency is compared with and without
+batch traffic queued behind it.
+
+    python benchmarks/bench_llm_scheduler.py --questions 400 --concurrency 80
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from stubs import StubChatModel, create_stub_lms_app, free_port, percentile, serve_in_thread
+
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ["ANSWER_CACHE_SIMILARITY"] = "0"  # "topic 1" and "topic 2" must both reach the LLM
+
+import app as service
+from llm_scheduler import BATCH, INTERACTIVE, LLMScheduler
+from structured_log import setup_logging, stop_logging
+
+
+def reset(llm, scheduler):
+    service.llm_scheduler = scheduler
+    service.llm_breaker.record_success()
+    service.answer_cache.clear()
+    llm.calls = llm.rate_limited = 0
+
+
+async def burst(client, llm, questions, concurrency, offset=0):
+    """(latencies, llm answers, fallback answers) for `questions` distinct /ask calls"""
+    limit = asyncio.Semaphore(concurrency)
+    latencies, answered, fallback = [], 0, 0
+
+    async def one(i):
+        nonlocal answered, fallback
+        async with limit:
+            start = time.perf_counter()
+            response = await client.post("/ask", json={
+                "student_id": str(100 + i % 50), "question": f"Which lecture covered topic {offset + i}?"})
+            latencies.append(time.perf_counter() - start)
+            answer = response.json().get("answer", "")
+            answered += answer == llm.reply
+            fallback += answer != llm.reply
+
+    await asyncio.gather(*(one(i) for i in range(questions)))
+    return latencies, answered, fallback
+
+
+async def compare_limits(client, llm, args):
+    print(f"burst of {args.questions} LLM questions, client concurrency {args.concurrency}, "
+          f"provider allows {args.provider_limit} concurrent calls ({args.llm_latency}s each)")
+    modes = {
+        "fixed": LLMScheduler(initial_limit=10 ** 4, min_limit=10 ** 4, max_limit=10 ** 4, queue_size=10 ** 4),
+        "adaptive": LLMScheduler(initial_limit=8, max_limit=64, queue_size=200, max_wait=10),
+    }
+    for name, scheduler in modes.items():
+        reset(llm, scheduler)
+        start = time.perf_counter()
+        latencies, answered, fallback = await burst(client, llm, args.questions, args.concurrency)
+        elapsed = time.perf_counter() - start
+        stats = scheduler.stats()
+        print(f"  {name:<9} llm answers={answered:<4} fallbacks={fallback:<4} provider 429s={llm.rate_limited:<5} "
+              f"p50={percentile(latencies, 50) * 1000:.0f}ms p95={percentile(latencies, 95) * 1000:.0f}ms "
+              f"elapsed={elapsed:.1f}s  limit={stats['concurrency_limit']} shed={stats['shed']}")
+
+
+async def compare_priority(client, llm, args):
+    print("interactive /ask while /ask/batch traffic waits for the LLM")
+    for name, batch_priority in (("no priority", INTERACTIVE), ("batch last", BATCH)):
+        reset(llm, LLMScheduler(initial_limit=args.provider_limit, min_limit=1, max_limit=args.provider_limit,
+                                queue_size=1000, max_wait=30))
+        service.BATCH = batch_priority
+        items = [{"student_id": str(200 + i % 50), "question": f"Which lecture covered batch topic {i}?"}
+                 for i in range(args.questions)]
+        batches = [asyncio.ensure_future(client.post("/ask/batch", json={"items": items[i:i + 50], "concurrency": 32}))
+                   for i in range(0, len(items), 50)]
+        await asyncio.sleep(0.05)  # let the batch calls queue first
+        latencies, answered, _ = await burst(client, llm, 50, 10, offset=10 ** 5)
+        await asyncio.gather(*batches)
+        print(f"  {name:<12} interactive p50={percentile(latencies, 50) * 1000:.0f}ms "
+              f"p95={percentile(latencies, 95) * 1000:.0f}ms  answered={answered}/50")
+    service.BATCH = BATCH
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=80)
+    parser.add_argument("--provider-limit", type=int, default=6)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    setup_logging()
+    lms_port = free_port()
+    serve_in_thread(create_stub_lms_app(latency=0.0, records=5), lms_port)
+    service.profile_cache.clear()
+    import fetch_student_data
+    fetch_student_data.STUDENT_API_BASE = f"http://127.0.0.1:{lms_port}/api/student-profile"
+    llm = StubChatModel(latency=args.llm_latency, max_concurrent=args.provider_limit)
+    service.llm = llm
+
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=60) as client:
+        await compare_limits(client, llm, args)
+        await compare_priority(client, llm, args)
+    await fetch_student_data.close_async_client()
+    stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
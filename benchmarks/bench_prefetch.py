@@ -0,0 +1,70 @@
+"""Prefetch job against a local mock of the student-profile endpoint.
+
+Warms the API's profile cache through POST /prefetch while the stub LMS
+randomly fails requests, then checks that the warmed students are served
+from the cache without touching the upstream again.
+
+    python benchmarks/bench_prefetch.py --students 500 --failure-rate 0.1
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fastapi.testclient import TestClient
+
+from stubs import StubChatModel, create_stub_lms_app, free_port, serve_in_thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=200.0)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--lms-latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    lms = create_stub_lms_app(latency=args.lms_latency, failure_rate=args.failure_rate)
+    lms_port = free_port()
+    serve_in_thread(lms, lms_port)
+    os.environ["STUDENT_API_BASE"] = f"http://127.0.0.1:{lms_port}/api/student-profile"
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+
+    import app as service
+    service.llm = StubChatModel(latency=0)
+    student_ids = [str(2000 + i) for i in range(args.students)]
+
+    with TestClient(service.app) as client:
+        job = client.post("/prefetch", json={
+            "student_ids": student_ids,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "retries": args.retries,
+        }).json()
+        while job["state"] in ("pending", "running"):
+            time.sleep(0.5)
+            job = client.get(f"/prefetch/{job['job_id']}").json()
+            print(f"{job['percent']:5.1f}%  ok={job['succeeded']} failed={job['failed']} "
+                  f"retries={job['retries']}  {job['profiles_per_second']} profiles/s", file=sys.stderr)
+
+        upstream_before = lms.state.requests
+        for student_id in student_ids:
+            client.get(f"/student/{student_id}/summary")
+        cold_fetches = lms.state.requests - upstream_before
+        stats = client.get("/cache/stats").json()["profiles"]
+
+    print(f"students={args.students} concurrency={args.concurrency} rate={args.rate}/s "
+          f"failure_rate={args.failure_rate:.0%}")
+    print(f"prefetch: {job['succeeded']}/{job['total']} warmed, {job['failed']} failed, "
+          f"{job['retries']} retries, {job['elapsed_seconds']}s ({job['profiles_per_second']} profiles/s)")
+    print(f"upstream requests: {upstream_before} during prefetch, {cold_fetches} while serving summaries")
+    print(f"profile cache: entries={stats['entries']} hits={stats['hits']} misses={stats['misses']}")
+
+
+if __name__ == "__main__":
+    main()
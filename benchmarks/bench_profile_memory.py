@@ -0,0 +1,101 @@
+"""Memory per cached student: raw LMS JSON vs what the profile cache holds.
+
+The cache entry is a whole StudentContext: the parsed StudentModel plus
+the summary, section index, flattened context records and the compact
+JSON of the payload kept for the JSON agent. The script reports the
+model alone, what the records add on top of it, and the full entry
+against the raw dict. "views KB" is the rendered record text a prompt
+build memoizes per student; it lives in the process-wide record_view
+cache (RECORD_VIEW_CACHE_SIZE records), not in the entry. It then times the
+parse and the per-request work it replaces (summary + deterministic
+answers on the raw dict vs on the model).
+
+    python benchmarks/bench_profile_memory.py --records 20 100 500
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stubs import make_profile
+
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+from app import extract_summary_from_data
+from context_builder import extract_records, record_view
+from profile_cache import deep_sizeof
+from student_context import StudentContext, build_context_index
+from student_model import encode_sections, parse_profile, section_hashes
+
+
+def build_context(student_id, student_data):
+    """The StudentContext load_student_context caches for a fresh fetch"""
+    raw_sections = encode_sections(student_data)
+    model = parse_profile(student_data)
+    summary = extract_summary_from_data(model)
+    return StudentContext(student_id, model, summary, build_context_index(model, summary), extract_records(model),
+                          section_hashes=section_hashes(raw_sections), raw_sections=raw_sections)
+
+
+def own_sizes(ctx):
+    """(model bytes, bytes the records add on top of the model, memoized view bytes)"""
+    seen = set()
+    model = deep_sizeof(ctx.model, seen)
+    records = deep_sizeof(ctx.records, seen)
+    return model, records, deep_sizeof([record_view(r) for r in ctx.records], seen)
+
+
+def raw_summary(student_data):
+    """The per-request dict walking the model replaces (old extract_summary_from_data)"""
+    lms = student_data.get("lms", {})
+    quizzes = lms.get("quizzes", {}).get("data", [])
+    scores = [int(q["obtained_marks"]) for q in quizzes
+              if q.get("obtained_marks") is not None and q["obtained_marks"].isdigit()]
+    pending = [a for a in lms.get("assignments", {}).get("data", []) if not a.get("obtain_marks")]
+    fees = student_data.get("fee_invoices", {})
+    return (sum(scores) / len(scores) if scores else 0, len(pending),
+            fees.get("paid_invoices", {}).get("total", 0), fees.get("unpaid_invoices", {}).get("total", 0))
+
+
+def model_summary(model):
+    return (model.quiz_average or 0, model.assignments_pending, model.paid_count, model.unpaid_count)
+
+
+def timed(fn, arg, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, nargs="+", default=[20, 100, 500])
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'records':>8} {'raw KB':>8} {'model KB':>9} {'records KB':>11} {'views KB':>9} {'json KB':>8} "
+          f"{'cached KB':>10} {'vs raw':>7} {'parse us':>9} {'raw us/req':>11} {'model us/req':>13}")
+    for records in args.records:
+        profiles = [make_profile(str(1000 + i), records=records) for i in range(args.students)]
+        contexts = [build_context(str(1000 + i), p) for i, p in enumerate(profiles)]
+        models = [ctx.model for ctx in contexts]
+        raw = sum(deep_sizeof(p) for p in profiles) / args.students
+        sizes = [own_sizes(ctx) for ctx in contexts]
+        parsed, flattened, views = (sum(column) / args.students for column in zip(*sizes))
+        encoded = sum(deep_sizeof(ctx.raw_sections) for ctx in contexts) / args.students
+        cached = sum(deep_sizeof(ctx) for ctx in contexts) / args.students
+        parse_us = timed(parse_profile, profiles[0], max(1, args.repeat // records))
+        print(f"{records:>8} {raw / 1024:>8.1f} {parsed / 1024:>9.1f} {flattened / 1024:>11.1f} {views / 1024:>9.1f} "
+              f"{encoded / 1024:>8.1f} {cached / 1024:>10.1f} {cached / raw:>6.1f}x {parse_us:>9.0f} "
+              f"{timed(raw_summary, profiles[0], args.repeat):>11.1f} "
+              f"{timed(model_summary, models[0], args.repeat):>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
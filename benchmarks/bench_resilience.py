@@ -0,0 +1,166 @@
+"""Fault injection for the LMS fetch and LLM calls.
+
+Runs the service against stubs that misbehave on purpose and checks the
+resilience layer:
+
+  hedging   a few LMS responses take 1 s; p99 fetch latency without and
+            with a hedged second request
+  retries   30% of LMS responses are 503; fetch success rate without and
+            with retries
+  outage    LMS and LLM both go down after the cache is warm: /ask keeps
+            answering (stale profile, summary answer), the breakers stop
+            the calls, and answers recover once the stubs come back
+  deadline  the LLM takes 3 s but the client allows 0.5 s (X-Request-Timeout)
+
+    python benchmarks/bench_resilience.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from stubs import StubChatModel, create_stub_lms_app, free_port, percentile, serve_in_thread
+
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ["PROFILE_CACHE_TTL"] = "0.5"
+os.environ["PROFILE_CACHE_STALE"] = "0"
+os.environ["LMS_BREAKER_RESET"] = "1"
+os.environ["LLM_BREAKER_RESET"] = "1"
+
+import app as service
+import fetch_student_data as fetch
+from structured_log import setup_logging, stop_logging
+
+
+def start_lms(**kwargs):
+    lms = create_stub_lms_app(**kwargs)
+    port = free_port()
+    serve_in_thread(lms, port)
+    fetch.STUDENT_API_BASE = f"http://127.0.0.1:{port}/api/student-profile"
+    return lms
+
+
+def reset_breakers(failure_threshold=5):
+    for breaker in (fetch.lms_breaker, service.llm_breaker):
+        breaker.failure_threshold = failure_threshold
+        breaker.record_success()
+
+
+async def fetch_many(total, concurrency=20):
+    """(latencies, successes) of `total` uncached profile fetches"""
+    limit = asyncio.Semaphore(concurrency)
+    latencies, ok = [], 0
+
+    async def one(i):
+        nonlocal ok
+        async with limit:
+            start = time.perf_counter()
+            data, _ = await fetch.async_fetch_profile_conditional(str(i))
+            latencies.append(time.perf_counter() - start)
+            ok += "error" not in data
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, ok
+
+
+async def hedging():
+    # Light load: the stub shares this process, and once it is CPU-bound every
+    # hedge slows the others down (the same holds for a saturated real LMS)
+    lms = start_lms(latency=0.02, records=5, slow_rate=0.05, slow_latency=1.0)
+    reset_breakers()
+    print("hedging: 5% of LMS responses take 1 s")
+    for hedge_after in (None, 0.1):
+        fetch.LMS_HEDGE_AFTER = hedge_after
+        before = lms.state.requests
+        latencies, _ = await fetch_many(400, concurrency=5)
+        print(f"  hedge_after={hedge_after!s:<5} p50={percentile(latencies, 50) * 1000:.0f}ms "
+              f"p99={percentile(latencies, 99) * 1000:.0f}ms  upstream requests={lms.state.requests - before}")
+    fetch.LMS_HEDGE_AFTER = None
+
+
+async def retries():
+    lms = start_lms(latency=0.01, failure_rate=0.3)
+    reset_breakers(failure_threshold=10 ** 6)  # measure retries alone
+    print("retries: 30% of LMS responses are 503")
+    for count in (0, 2):
+        fetch.LMS_RETRIES = count
+        before = lms.state.requests
+        _, ok = await fetch_many(400)
+        print(f"  retries={count}  success={ok / 400:.1%}  upstream requests={lms.state.requests - before}")
+    fetch.LMS_RETRIES = 2
+    reset_breakers()
+
+
+async def outage(client, llm):
+    lms = start_lms(latency=0.01)
+    reset_breakers()
+    students = [str(5000 + i) for i in range(20)]
+    question = "Which lecture covered recursion?"
+    for student_id in students:
+        await client.post("/ask", json={"student_id": student_id, "question": question})
+
+    lms.state.down = True
+    llm.down = True
+    service.answer_cache.clear()
+    await asyncio.sleep(0.6)  # cached profiles are now past their TTL
+    lms_before, llm_before = lms.state.requests, llm.calls
+    statuses, degraded, latencies = [], 0, []
+    for i in range(100):
+        start = time.perf_counter()
+        response = await client.post("/ask", json={"student_id": students[i % 20], "question": question})
+        latencies.append(time.perf_counter() - start)
+        statuses.append(response.status_code)
+        degraded += "summary of your current records" in response.json().get("answer", "")
+    print("outage: LMS and LLM down, profiles cached but expired")
+    print(f"  /ask 200s={statuses.count(200)}/100  summary answers={degraded}  "
+          f"p50={percentile(latencies, 50) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms")
+    print(f"  upstream calls during outage: lms={lms.state.requests - lms_before} llm={llm.calls - llm_before}  "
+          f"breakers: lms={fetch.lms_breaker.state} llm={service.llm_breaker.state}")
+
+    lms.state.down = False
+    llm.down = False
+    await asyncio.sleep(1.1)  # breaker reset time
+    recovered = 0
+    for student_id in students:
+        response = await client.post("/ask", json={"student_id": student_id, "question": question})
+        recovered += response.json().get("answer") == llm.reply
+    print(f"  after recovery: llm answers={recovered}/20  breakers: lms={fetch.lms_breaker.state} "
+          f"llm={service.llm_breaker.state}")
+
+
+async def deadline(client, llm):
+    start_lms(latency=0.01)
+    reset_breakers()
+    llm.latency = 3.0
+    start = time.perf_counter()
+    response = await client.post("/ask", json={"student_id": "7000", "question": "Which lecture covered recursion?"},
+                                 headers={"X-Request-Timeout": "0.5"})
+    elapsed = time.perf_counter() - start
+    print("deadline: LLM takes 3 s, client allows 0.5 s")
+    print(f"  status={response.status_code} elapsed={elapsed * 1000:.0f}ms "
+          f"summary answer={'summary of your current records' in response.json().get('answer', '')}")
+    llm.latency = 0.01
+
+
+async def main():
+    setup_logging()
+    await hedging()
+    await retries()
+    llm = StubChatModel(latency=0.01)
+    service.llm = llm
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=30) as client:
+        await outage(client, llm)
+        await deadline(client, llm)
+    await fetch.close_async_client()
+    stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
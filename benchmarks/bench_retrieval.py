@@ -0,0 +1,147 @@
+"""Prompt context for course-material questions, with and without retrieval.
+
+Students share their course's lecture notes, videos, announcements and
+news (stub LMS with shared content). For questions like "Which lecture
+covered recursion?" the script builds the /ask prompt with the old
+word-overlap ranking (RETRIEVAL_TOP_K=0) and with the BM25 course index
+(top-k hits only), and reports prompt tokens, whether the record that
+answers the question made it into the prompt, and the time per question.
+It also reports how much the per-course index is shared and what an
+incremental update costs compared with rebuilding it, how much index
+state each student adds, and that evicting every profile empties it.
+
+    python benchmarks/bench_retrieval.py --students 300 --records 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stubs import StubChatModel, course_material, create_stub_lms_app, free_port, serve_in_thread
+
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import app as service
+import fetch_student_data as fetch
+from answer_strategies import build_indexed_prompt, route_question
+from context_builder import RETRIEVAL_SECTIONS, SECTION_TITLES
+from profile_cache import deep_sizeof
+from retrieval_index import RetrievalIndex, course_key
+from structured_log import setup_logging, stop_logging
+
+QUESTIONS = (
+    ("Which lecture covered {topic}?", "Lecture", "lec_title"),
+    ("Is there a video on {topic}?", "Video", "video_title"),
+    ("Was the {topic} lab moved?", "lab moved", "title"),
+)
+
+
+def make_questions(ctx, records, rng, count):
+    """(question, text the answering record starts with) pairs about this student's course"""
+    notes, videos, announcements, _ = course_material(ctx.model.profile.course_name, records)
+    pools = {"lec_title": [n["lec_title"] for n in notes], "video_title": [v["video_title"] for v in videos],
+             "title": [a["title"] for a in announcements if "lab moved" in a["title"]]}
+    questions = []
+    for _ in range(count):
+        template, _, field = rng.choice(QUESTIONS)
+        title = rng.choice(pools[field])
+        topic = title.split(": ", 1)[-1].replace(" walkthrough", "").replace(" lab moved to Friday", "")
+        questions.append((template.format(topic=topic.lower()), title))
+    return questions
+
+
+def material_lines(text):
+    """Records listed under the lecture, video, announcement and news headings"""
+    titles = {SECTION_TITLES[name] for name in RETRIEVAL_SECTIONS}
+    count, inside = 0, False
+    for line in text.splitlines():
+        if line in SECTION_TITLES.values():
+            inside = line in titles
+        elif inside and line.startswith("- "):
+            count += 1
+    return count
+
+
+def run(questions, top_k):
+    tokens, material, found, seconds = [], [], 0, 0.0
+    for ctx, (question, expected) in questions:
+        start = time.perf_counter()
+        retrieved = None
+        if top_k:
+            retrieved = service.retrieval_index.scores(course_key(ctx.model), question, ctx.records)
+        sections = route_question(question).sections
+        _, built = build_indexed_prompt(question, ctx, sections, service.CONTEXT_TOKEN_BUDGET, retrieved, top_k)
+        seconds += time.perf_counter() - start
+        tokens.append(built.tokens_used)
+        material.append(material_lines(built.text))
+        found += expected in built.text
+    return {"tokens": statistics.fmean(tokens), "material": statistics.fmean(material),
+            "found": found / len(questions), "us": seconds / len(questions) * 1e6}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--records", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_logging()
+    port = free_port()
+    lms = create_stub_lms_app(latency=0, records=args.records, shared_content=True)
+    serve_in_thread(lms, port)
+    fetch.STUDENT_API_BASE = f"http://127.0.0.1:{port}/api/student-profile"
+    service.llm = StubChatModel(latency=0)
+    student_ids = [str(20000 + i) for i in range(args.students)]
+    contexts = [await service.get_student_context(student_id) for student_id in student_ids]
+
+    rng = random.Random(7)
+    questions = []
+    for _ in range(args.questions):
+        ctx = rng.choice(contexts)
+        questions.extend((ctx, q) for q in make_questions(ctx, args.records, rng, 1))
+
+    print(f"students={args.students} records per section={args.records} questions={len(questions)} "
+          f"token budget={service.CONTEXT_TOKEN_BUDGET}")
+    for name, top_k in (("word overlap", 0), (f"bm25 top-{args.top_k}", args.top_k)):
+        result = run(questions, top_k)
+        print(f"  {name:<13} prompt tokens={result['tokens']:.0f}  material lines={result['material']:.1f}  "
+              f"answer in prompt={result['found']:.1%}  {result['us']:.0f} us/question")
+
+    stats = service.retrieval_index.stats()
+    records = sum(1 for ctx in contexts for r in ctx.records if r.section in RETRIEVAL_SECTIONS)
+    print(f"index: {stats['courses']} courses, {stats['documents']} documents for {records} material "
+          f"records across students, {stats['terms']} terms")
+
+    start = time.perf_counter()
+    rebuilt = RetrievalIndex()
+    for ctx in contexts:
+        rebuilt.update(ctx.student_id, course_key(ctx.model), ctx.records)
+    rebuild = time.perf_counter() - start
+    for student_id in student_ids[:50]:
+        lms.state.revisions[student_id] = 2  # two new announcements each
+    changed = [await service.load_student_context(student_id) for student_id in student_ids[:50]]
+    start = time.perf_counter()
+    for ctx in changed:
+        rebuilt.update(ctx.student_id, course_key(ctx.model), ctx.records)
+    incremental = (time.perf_counter() - start) / len(changed)
+    print(f"build from scratch: {rebuild * 1000:.1f} ms for {len(contexts)} students; "
+          f"incremental update: {incremental * 1e6:.0f} us per changed student")
+    per_student = deep_sizeof(service.retrieval_index._students) / len(contexts)
+    service.profile_cache.clear()
+    print(f"index state per student: {per_student:.0f} bytes; after evicting every profile: "
+          f"{service.retrieval_index.stats()['documents']} documents")
+    await fetch.close_async_client()
+    stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,292 @@
+"""Load test and regression gate for the API.
+
+Replays a question corpus against the app with the stub LMS and stub LLM
+from stubs.py, as a mix of /ask, /chat and /ask/batch requests, and
+reports throughput, p50/p95/p99 latency, LLM calls per question and
+memory. The corpus is the seed questions in seed_questions.jsonl plus
+the labelled intent corpus, each question also sent in a re-cased /
+re-punctuated variant like real students type them. --seed-corpus adds
+the questions quoted in a change-request backlog file (JSON lines with
+a "body").
+
+With --thresholds the run is compared against limits (see
+load_thresholds.json) and the script exits with status 1 if any is
+crossed, so it can gate CI:
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --questions 2000 --concurrency 100 --llm-latency 0.3
+    python benchmarks/load_test.py --thresholds benchmarks/load_thresholds.json --output run.json
+    python benchmarks/load_test.py --baseline run.json --tolerance 0.25   # relative to an earlier run
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from profile_cache import deep_sizeof
+from stubs import StubChatModel, create_stub_lms_app, free_port, percentile, serve_in_thread
+
+_QUOTED_RE = re.compile(r'"([^"]{6,120})"')
+_QUESTION_RE = re.compile(r"^(what|which|when|how|who|where|why|do|does|did|is|are|can|pending|show|list)\b", re.I)
+
+# Lower is better for these; everything else in a threshold file is a minimum
+_MAXIMUMS = {"p50_ms", "p95_ms", "p99_ms", "error_rate", "llm_calls_per_question", "peak_rss_mb"}
+
+
+# === Corpus ===
+def seed_questions(path):
+    """Student questions quoted in a backlog file's request bodies"""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            for text in _QUOTED_RE.findall(json.loads(line)["body"]):
+                if _QUESTION_RE.match(text) and "`" not in text:
+                    questions.append(text)
+    return questions
+
+
+def load_corpus(seed_path, extra_paths=()):
+    """Seed questions plus labelled corpora, deduplicated, each with a typed variant"""
+    questions = seed_questions(seed_path) if seed_path else []
+    for path in extra_paths:
+        with open(path, encoding="utf-8") as f:
+            questions.extend(json.loads(line)["question"] for line in f if line.strip())
+    questions.extend(["hi", "hello", "thanks"])
+    corpus = list(dict.fromkeys(questions))
+    variants = [q.lower().rstrip("?") + " ?" if q.endswith("?") else q.capitalize() + "?" for q in corpus]
+    return corpus + [v for v in variants if v not in corpus]
+
+
+def plan_requests(corpus, students, total, mix, batch_size, rng):
+    """(endpoint, student_id, question or batch items) for every request, reproducible from the seed"""
+    endpoints = list(mix)
+    weights = [mix[name] for name in endpoints]
+    plan = []
+    for _ in range(total):
+        endpoint = rng.choices(endpoints, weights)[0]
+        student_id = str(1000 + rng.randrange(students))
+        if endpoint == "batch":
+            items = [{"student_id": str(1000 + rng.randrange(students)), "question": rng.choice(corpus)}
+                     for _ in range(batch_size)]
+            plan.append((endpoint, student_id, items))
+        else:
+            plan.append((endpoint, student_id, rng.choice(corpus)))
+    return plan
+
+
+# === Load ===
+async def replay(base_url, plan, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = {name: [] for name in ("ask", "chat", "batch")}
+    counts = {"requests": 0, "questions": 0, "errors": 0}
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+
+        async def one(endpoint, student_id, payload):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    if endpoint == "ask":
+                        response = await client.post("/ask", json={"student_id": student_id, "question": payload})
+                    elif endpoint == "chat":
+                        response = await client.post(f"/chat/{student_id}", json={"message": payload})
+                    else:
+                        response = await client.post("/ask/batch", json={"items": payload})
+                    body = response.json()
+                    failed = response.status_code != 200 or "error" in body
+                    if endpoint == "batch" and not failed:
+                        failed = any("error" in result for result in body["results"])
+                except (httpx.HTTPError, ValueError) as e:
+                    body, failed = repr(e), True
+                if failed and counts["errors"] < 3:
+                    print(f"error from /{endpoint}: {str(body)[:200]}", file=sys.stderr)
+                latencies[endpoint].append(time.perf_counter() - start)
+                counts["requests"] += 1
+                counts["questions"] += len(payload) if endpoint == "batch" else 1
+                counts["errors"] += failed
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(*request) for request in plan))
+        elapsed = time.perf_counter() - start
+
+    return latencies, counts, elapsed
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return 0.0
+
+
+def summarize(latencies, counts, elapsed, llm_calls, rss_before, cache):
+    every = [seconds for values in latencies.values() for seconds in values]
+    result = {
+        "requests": counts["requests"],
+        "questions": counts["questions"],
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(counts["requests"] / elapsed, 1),
+        "questions_per_s": round(counts["questions"] / elapsed, 1),
+        "p50_ms": round(percentile(every, 50) * 1000, 1),
+        "p95_ms": round(percentile(every, 95) * 1000, 1),
+        "p99_ms": round(percentile(every, 99) * 1000, 1),
+        "error_rate": round(counts["errors"] / max(1, counts["requests"]), 4),
+        "llm_calls": llm_calls,
+        "llm_calls_per_question": round(llm_calls / max(1, counts["questions"]), 3),
+        # ru_maxrss is KiB on Linux; includes the in-process stubs and test client
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "rss_growth_mb": round(current_rss_mb() - rss_before, 1),
+        "profile_cache_entries": cache["profile_entries"],
+        "profile_cache_mb": round(cache["profile_bytes"] / 2 ** 20, 2),
+        "answer_cache_entries": cache["answer_entries"],
+        "endpoints": {
+            name: {"requests": len(values),
+                   "p50_ms": round(percentile(values, 50) * 1000, 1),
+                   "p95_ms": round(percentile(values, 95) * 1000, 1),
+                   "p99_ms": round(percentile(values, 99) * 1000, 1)}
+            for name, values in latencies.items() if values
+        },
+    }
+    return result
+
+
+# === Regression gate ===
+def check_thresholds(result, thresholds):
+    """Failures as messages; each threshold is a maximum for latency-like keys, else a minimum"""
+    failures = []
+    for key, limit in thresholds.items():
+        if key.startswith("_") or key not in result:
+            continue
+        value = result[key]
+        if key in _MAXIMUMS and value > limit:
+            failures.append(f"{key} {value} > {limit}")
+        elif key not in _MAXIMUMS and value < limit:
+            failures.append(f"{key} {value} < {limit}")
+    return failures
+
+
+def baseline_thresholds(baseline, tolerance):
+    """Limits `tolerance` worse than an earlier run's results"""
+    thresholds = {}
+    for key, value in baseline.items():
+        if not isinstance(value, (int, float)) or key not in _MAXIMUMS | {"requests_per_s", "questions_per_s"}:
+            continue
+        if key == "error_rate":
+            thresholds[key] = value + 0.01
+        elif key in _MAXIMUMS:
+            thresholds[key] = round(value * (1 + tolerance), 3)
+        else:
+            thresholds[key] = round(value * (1 - tolerance), 3)
+    return thresholds
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("ask", "chat", "batch"):
+            raise argparse.ArgumentTypeError(f"unknown endpoint in --mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed-corpus", default=None, help="backlog JSONL to pull quoted questions from")
+    parser.add_argument("--corpus", nargs="*", default=[os.path.join(HERE, "seed_questions.jsonl"),
+                                                        os.path.join(HERE, "intent_corpus.jsonl")])
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=1000, help="requests to send")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("ask=0.7,chat=0.2,batch=0.1"))
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--records", type=int, default=20, help="records per profile section")
+    parser.add_argument("--lms-latency", type=float, default=0.02)
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0, help="0 sends the reply at once")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--thresholds", help="JSON file of limits; exit 1 if one is crossed")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression vs --baseline")
+    parser.add_argument("--output", help="write the results JSON here")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.seed_corpus, args.corpus)
+    plan = plan_requests(corpus, args.students, args.questions, args.mix, args.batch_size, random.Random(args.seed))
+
+    lms_port = free_port()
+    serve_in_thread(create_stub_lms_app(latency=args.lms_latency, records=args.records), lms_port)
+    os.environ["STUDENT_API_BASE"] = f"http://127.0.0.1:{lms_port}/api/student-profile"
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("WARM_LLM_STACK", "0")
+
+    import app as service
+    stub_llm = StubChatModel(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second)
+    service.llm = stub_llm
+
+    rss_before = current_rss_mb()
+    app_port = free_port()
+    serve_in_thread(service.app, app_port)
+    latencies, counts, elapsed = asyncio.run(replay(f"http://127.0.0.1:{app_port}", plan, args.concurrency))
+    contexts = [service.profile_cache.peek(str(1000 + i)) for i in range(args.students)]
+    cache = {
+        "profile_entries": service.profile_cache.stats()["entries"],
+        "profile_bytes": sum(deep_sizeof(ctx) for ctx in contexts if ctx is not None),
+        "answer_entries": service.answer_cache.stats()["entries"],
+    }
+    result = summarize(latencies, counts, elapsed, stub_llm.calls, rss_before, cache)
+
+    print(f"corpus={len(corpus)} questions  students={args.students}  requests={args.questions}  "
+          f"concurrency={args.concurrency}  records={args.records}")
+    print(f"llm latency={args.llm_latency:.3f}s tokens/s={args.llm_tokens_per_second or 'inf'}  "
+          f"lms latency={args.lms_latency:.3f}s")
+    print(f"throughput: {result['requests_per_s']} req/s, {result['questions_per_s']} questions/s  "
+          f"errors: {result['error_rate']:.2%}")
+    print(f"latency p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms")
+    for name, stats in result["endpoints"].items():
+        print(f"  {name:<6} n={stats['requests']:<5} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+              f"p99={stats['p99_ms']}ms")
+    print(f"llm calls: {result['llm_calls']} ({result['llm_calls_per_question']} per question)")
+    print(f"memory: peak rss {result['peak_rss_mb']} MB, growth {result['rss_growth_mb']} MB, "
+          f"{result['profile_cache_entries']} cached profiles ({result['profile_cache_mb']} MB), "
+          f"{result['answer_cache_entries']} cached answers")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    thresholds = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            thresholds.update(baseline_thresholds(json.load(f), args.tolerance))
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            thresholds.update(json.load(f))
+    if thresholds:
+        failures = check_thresholds(result, thresholds)
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        if failures:
+            sys.exit(1)
+        print(f"ok: within {len(thresholds)} thresholds")
+
+
+if __name__ == "__main__":
+    main()
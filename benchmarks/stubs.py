@@ -0,0 +1,275 @@
+"""Local stand-ins for the LMS student-profile API and the Groq LLM.
+
+Used by the benchmark scripts in this folder so they can run without
+network access or API keys.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+# === Fake student profiles ===
+COURSE_TOPICS = (
+    "Recursion", "Sorting algorithms", "CSS Grid", "SQL joins", "Git branching", "Linked lists",
+    "Binary search", "Hash tables", "REST APIs", "Unit testing", "Flexbox", "React hooks",
+    "Pandas dataframes", "NumPy arrays", "Regular expressions", "Dynamic programming", "Graph traversal",
+    "Big O notation", "Closures", "Async programming", "Docker basics", "Linear regression",
+    "Decision trees", "Typography", "Color theory", "Responsive design", "Authentication",
+    "Database indexing", "Object oriented design", "Error handling",
+)
+
+
+def course_material(course, records=20):
+    """Lecture notes, videos, announcements and news that every student of `course` sees"""
+    rng = random.Random(course)
+    topics = rng.sample(COURSE_TOPICS, min(records, len(COURSE_TOPICS)))
+    dates = sorted(f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" for _ in range(records))
+    notes = [{"lec_title": f"Lecture {i + 1}: {topics[i % len(topics)]}", "lec_date": dates[i]}
+             for i in range(records)]
+    videos = [{"video_title": f"Video {i + 1}: {topics[(i * 7) % len(topics)]} walkthrough", "lec_date": dates[i]}
+              for i in range(records)]
+    announcements = [{"title": "Midterm schedule released", "date": "2025-03-01"}] + [
+        {"title": f"{topic} lab moved to Friday", "date": f"2025-04-{i + 1:02d}"}
+        for i, topic in enumerate(rng.sample(topics, min(4, len(topics))))]
+    news = [{"title": "Career fair next week", "date": "2025-03-04"},
+            {"title": f"Guest talk on {rng.choice(topics)}", "date": "2025-05-10"}]
+    return notes, videos, announcements, news
+
+
+def make_profile(student_id, records=20, seed=None, shared_content=False):
+    """Build a profile shaped like the LMS `student-profile` payload
+
+    With `shared_content` the lecture notes, videos, announcements and news
+    come from the student's course (see course_material) instead of being
+    drawn per student.
+    """
+    rng = random.Random(seed if seed is not None else str(student_id))
+    batch = rng.choice(["Batch 11", "Batch 12", "Batch 13"])
+    course = rng.choice(["Web Development", "Data Science", "Graphic Design"])
+
+    assignments = []
+    for i in range(records):
+        done = rng.random() < 0.6
+        assignments.append({
+            "id": i,
+            "add_title": f"Assignment {i + 1}: {rng.choice(['HTML basics', 'Recursion', 'Pandas', 'Loops', 'APIs'])}",
+            "submission_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "total_marks": "20",
+            "obtain_marks": str(rng.randint(5, 20)) if done else None,
+        })
+
+    quizzes = []
+    for i in range(records):
+        done = rng.random() < 0.7
+        quizzes.append({
+            "id": i,
+            "title": f"Quiz {i + 1}",
+            "marks": "10",
+            "obtained_marks": str(rng.randint(2, 10)) if done else None,
+            "lastDate": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        })
+
+    notes = [{"lec_title": f"Lecture {i + 1}: {rng.choice(['Recursion', 'Sorting', 'CSS Grid', 'SQL Joins', 'Git'])}",
+              "lec_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"} for i in range(records)]
+    videos = [{"video_title": f"Video {i + 1}: {rng.choice(['Functions', 'Flexbox', 'NumPy', 'React Hooks'])}",
+               "lec_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"} for i in range(records)]
+
+    paid = [{"fee_amount": "15000", "receipt_date": f"2025-{m:02d}-05", "receipt_id": f"R-{student_id}-{m}"}
+            for m in range(1, rng.randint(2, 6))]
+    unpaid = [{"fee_amount": "15000", "due_date": f"2025-{m:02d}-05", "invoice_id": f"I-{student_id}-{m}"}
+              for m in range(6, 6 + rng.randint(0, 3))]
+
+    announcements = [{"title": "Midterm schedule released", "date": "2025-03-01"}]
+    news = [{"title": "Career fair next week", "date": "2025-03-04"}]
+    if shared_content:
+        notes, videos, announcements, news = course_material(course, records)
+
+    return {
+        "profile": {
+            "id": student_id,
+            "first_name": rng.choice(["Ali", "Sara", "Hamza", "Ayesha", "Bilal"]),
+            "last_name": rng.choice(["Khan", "Ahmed", "Malik", "Raza"]),
+            "email": f"student{student_id}@example.com",
+            "gender": rng.choice(["Male", "Female"]),
+            "date_of_birth": "2001-04-12",
+            "city": rng.choice(["Lahore", "Karachi", "Islamabad"]),
+            "course_name": course,
+            "batch_name": batch,
+            "branch_name": "Main Campus",
+        },
+        "lms": {
+            "assignments": {"count": len(assignments), "data": assignments},
+            "quizzes": {"count": len(quizzes), "data": quizzes},
+            "lecture_notes": {"count": len(notes), "data": notes},
+            "video_tutorials": {"count": len(videos), "data": videos},
+        },
+        "fee_invoices": {
+            "paid_invoices": {"total": len(paid), "paid": paid},
+            "unpaid_invoices": {"total": len(unpaid), "unpaid": unpaid},
+        },
+        "announcements": announcements,
+        "news": news,
+        "help_support": [],
+    }
+
+
+def change_profile(profile, revision):
+    """Apply `revision` partial changes: new announcements, plus a graded quiz every third one"""
+    for i in range(revision):
+        profile["announcements"].append({"title": f"Update {i + 1}: timetable changed", "date": "2025-04-01"})
+        if i % 3 == 2:
+            quiz = profile["lms"]["quizzes"]["data"][i % len(profile["lms"]["quizzes"]["data"])]
+            quiz["obtained_marks"] = "10"
+    return profile
+
+
+def create_stub_lms_app(latency=0.05, records=20, failure_rate=0.0, etag=False, slow_rate=0.0, slow_latency=1.0,
+                        shared_content=False):
+    """FastAPI app serving fake profiles at /api/student-profile/{student_id}
+
+    `failure_rate` is the fraction of requests answered with a 503 and
+    `slow_rate` the fraction that take `slow_latency` seconds instead of
+    `latency`; set `app.state.down` to fail every request (an outage).
+    With `etag` the responses carry an ETag and a matching If-None-Match
+    gets a 304. Bump `app.state.revisions[student_id]` to change a profile.
+    `shared_content` gives every student of a course the same material.
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.failures = 0
+    app.state.not_modified = 0
+    app.state.revisions = {}
+    app.state.etag = etag
+    app.state.down = False
+
+    @app.get("/api/student-profile/{student_id}")
+    async def student_profile(student_id: str, request: Request):
+        app.state.requests += 1
+        slow = slow_rate and random.random() < slow_rate
+        await asyncio.sleep(slow_latency if slow else latency)
+        if app.state.down or (failure_rate and random.random() < failure_rate):
+            app.state.failures += 1
+            return JSONResponse({"message": "Service Unavailable"}, status_code=503)
+        profile = change_profile(make_profile(student_id, records=records, shared_content=shared_content), app.state.revisions.get(student_id, 0))
+        body = json.dumps(profile).encode()
+        if not app.state.etag:
+            return Response(body, media_type="application/json")
+        tag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        if request.headers.get("if-none-match") == tag:
+            app.state.not_modified += 1
+            return Response(status_code=304, headers={"ETag": tag})
+        return Response(body, media_type="application/json", headers={"ETag": tag})
+
+    return app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_thread(app, port):
+    """Run an ASGI app with uvicorn on a daemon thread; returns the server"""
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+# === Fake LLM ===
+class StubRateLimitError(Exception):
+    """What the provider raises for HTTP 429"""
+    status_code = 429
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that waits `latency` seconds then emits `reply` at `tokens_per_second`.
+
+    `failure_rate` of the calls (or all of them while `down`) raise after the
+    wait. With `max_concurrent`, async calls beyond that many in flight are
+    rejected at once with a 429, like a provider's rate limit.
+    """
+
+    reply: str = "Final Answer: You have 3 pending assignments and your quiz average is 7.5."
+    latency: float = 0.2
+    tokens_per_second: float = 0.0  # 0 means the whole reply arrives at once
+    failure_rate: float = 0.0
+    down: bool = False
+    max_concurrent: int = 0
+    in_flight: int = 0
+    rate_limited: int = 0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat-model"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency + self._emit_seconds())
+        self._maybe_fail()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._admit()
+        try:
+            await asyncio.sleep(self.latency + self._emit_seconds())
+        finally:
+            self.in_flight -= 1
+        self._maybe_fail()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._admit()
+        try:
+            await asyncio.sleep(self.latency)
+            self._maybe_fail()
+            delay = 1 / self.tokens_per_second if self.tokens_per_second else 0
+            for token in self.reply.split(" "):
+                if delay:
+                    await asyncio.sleep(delay)
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            self.in_flight -= 1
+
+    def _admit(self):
+        self.calls += 1
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            self.rate_limited += 1
+            raise StubRateLimitError("429 Too Many Requests")
+        self.in_flight += 1
+
+    def _maybe_fail(self):
+        if self.down or (self.failure_rate and random.random() < self.failure_rate):
+            raise RuntimeError("stub LLM unavailable")
+
+    def _emit_seconds(self):
+        if not self.tokens_per_second:
+            return 0
+        return len(self.reply.split(" ")) / self.tokens_per_second
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,262 @@
+"""Multi-turn chat sessions with a bounded prompt.
+
+A session keeps the last few turns verbatim and folds older ones into a
+rolling summary (one short "Q: ... A: ..." line per turn, oldest lines
+dropped past a token budget), so the history sent to the LLM stays the
+same size however long the conversation gets. The formatted profile
+context is stored with the session and reused until it is older than
+the profile TTL.
+
+Sessions live in a store: MemorySessionStore (LRU, byte-capped) or
+SQLiteSessionStore (on disk, row-capped). Both expire sessions that have
+been idle longer than their TTL, and key them by student and session ID,
+so one student's session ID never reaches another student's conversation.
+The request path uses the async methods; the SQLite store runs its
+queries in a worker thread.
+"""
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from context_builder import estimate_tokens
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def session_key(student_id, session_id) -> str:
+    return f"{student_id}:{session_id}"
+
+
+def compress_turn(question, reply, max_chars=160) -> str:
+    """One summary line for a turn: the question and the first sentence of the reply"""
+    first = _SENTENCE_RE.split(reply.strip(), maxsplit=1)[0] if reply else ""
+    line = f"Q: {' '.join(question.split())} A: {' '.join(first.split())}"
+    return line if len(line) <= max_chars else line[:max_chars - 3] + "..."
+
+
+class ChatSession:
+    __slots__ = ("session_id", "student_id", "summary", "turns", "profile_text", "profile_at", "updated_at")
+
+    def __init__(self, session_id, student_id, summary=None, turns=None, profile_text=None,
+                 profile_at=0.0, updated_at=None):
+        self.session_id = session_id
+        self.student_id = student_id
+        self.summary = summary if summary is not None else []  # compressed older turns, oldest first
+        self.turns = turns if turns is not None else []        # recent (question, reply) pairs
+        self.profile_text = profile_text
+        self.profile_at = profile_at
+        self.updated_at = updated_at if updated_at is not None else time.time()
+
+    @property
+    def key(self) -> str:
+        return session_key(self.student_id, self.session_id)
+
+    def profile_is_fresh(self, ttl_seconds) -> bool:
+        return self.profile_text is not None and time.time() - self.profile_at < ttl_seconds
+
+    def set_profile(self, text):
+        self.profile_text = text
+        self.profile_at = time.time()
+
+    def add_turn(self, question, reply, recent_turns=4, summary_tokens=200):
+        """Append a turn, folding the oldest turns into the summary past `recent_turns`"""
+        self.turns.append((question, reply))
+        while len(self.turns) > recent_turns:
+            self.summary.append(compress_turn(*self.turns.pop(0)))
+        while self.summary and sum(estimate_tokens(line) for line in self.summary) > summary_tokens:
+            self.summary.pop(0)
+        self.updated_at = time.time()
+
+    def history_text(self) -> str:
+        """Conversation so far, for the prompt's {history} slot"""
+        lines = []
+        if self.summary:
+            lines.append("Earlier in this conversation:")
+            lines.extend(f"- {line}" for line in self.summary)
+        for question, reply in self.turns:
+            lines.append(f"Student: {question}")
+            lines.append(f"Assistant: {reply}")
+        return "\n".join(lines) if lines else "(this is the first message)"
+
+    def size(self) -> int:
+        """Approximate bytes held by the session"""
+        text = sum(len(q) + len(r) for q, r in self.turns) + sum(len(line) for line in self.summary)
+        return 256 + text + len(self.profile_text or "")
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "student_id": self.student_id,
+            "summary": self.summary,
+            "turns": self.turns,
+            "profile_text": self.profile_text,
+            "profile_at": self.profile_at,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["session_id"], data["student_id"], data["summary"],
+                   [tuple(turn) for turn in data["turns"]], data["profile_text"],
+                   data["profile_at"], data["updated_at"])
+
+
+# === Stores ===
+class MemorySessionStore:
+    """In-process sessions, least recently used evicted past `max_sessions` or `max_bytes`"""
+
+    def __init__(self, ttl_seconds=1800, max_sessions=10000, max_bytes=64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()  # session key -> (ChatSession, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def get(self, student_id, session_id):
+        key = session_key(student_id, session_id)
+        with self._lock:
+            item = self._sessions.get(key)
+            if item is None:
+                self._counters["misses"] += 1
+                return None
+            session, _ = item
+            if time.time() - session.updated_at >= self.ttl_seconds:
+                self._remove(key)
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._sessions.move_to_end(key)
+            self._counters["hits"] += 1
+            return session
+
+    def put(self, session):
+        size = session.size()
+        with self._lock:
+            self._remove(session.key)
+            self._sessions[session.key] = (session, size)
+            self._bytes += size
+            while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._sessions))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def delete(self, student_id, session_id) -> bool:
+        with self._lock:
+            return self._remove(session_key(student_id, session_id))
+
+    # Nothing here blocks, so the async variants run inline
+    async def aget(self, student_id, session_id):
+        return self.get(student_id, session_id)
+
+    async def aput(self, session):
+        self.put(session)
+
+    async def adelete(self, student_id, session_id) -> bool:
+        return self.delete(student_id, session_id)
+
+    def _remove(self, key) -> bool:
+        item = self._sessions.pop(key, None)
+        if item is None:
+            return False
+        self._bytes -= item[1]
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", **self._counters, "sessions": len(self._sessions),
+                    "bytes": self._bytes, "max_bytes": self.max_bytes, "ttl_seconds": self.ttl_seconds}
+
+    def close(self):
+        pass
+
+
+class SQLiteSessionStore:
+    """Sessions in a local SQLite file, so they survive restarts and are shared by workers"""
+
+    PURGE_EVERY = 100  # writes between sweeps of expired and excess rows
+
+    def __init__(self, path="chat_sessions.db", ttl_seconds=1800, max_sessions=100000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # session_id holds the session key (student_id:session_id)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            "session_id TEXT PRIMARY KEY, updated_at REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS chat_sessions_updated ON chat_sessions (updated_at)")
+
+    def get(self, student_id, session_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM chat_sessions WHERE session_id = ? AND updated_at > ?",
+                (session_key(student_id, session_id), time.time() - self.ttl_seconds),
+            ).fetchone()
+        return ChatSession.from_dict(json.loads(row[0])) if row else None
+
+    def put(self, session):
+        data = json.dumps(session.to_dict(), ensure_ascii=False)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO chat_sessions (session_id, updated_at, data) VALUES (?, ?, ?)",
+                (session.key, session.updated_at, data),
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._purge()
+
+    def delete(self, student_id, session_id) -> bool:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM chat_sessions WHERE session_id = ?",
+                                      (session_key(student_id, session_id),))
+            return cursor.rowcount > 0
+
+    # Queries (and the purge a put may trigger) block, so keep them off the event loop
+    async def aget(self, student_id, session_id):
+        return await asyncio.to_thread(self.get, student_id, session_id)
+
+    async def aput(self, session):
+        await asyncio.to_thread(self.put, session)
+
+    async def adelete(self, student_id, session_id) -> bool:
+        return await asyncio.to_thread(self.delete, student_id, session_id)
+
+    def _purge(self):
+        self._db.execute("DELETE FROM chat_sessions WHERE updated_at <= ?", (time.time() - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM chat_sessions WHERE session_id IN ("
+            "SELECT session_id FROM chat_sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+        return {"backend": "sqlite", "path": self.path, "sessions": count,
+                "max_sessions": self.max_sessions, "ttl_seconds": self.ttl_seconds}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def create_session_store(backend="memory", path="chat_sessions.db", ttl_seconds=1800,
+                         max_sessions=10000, max_bytes=64 * 1024 * 1024):
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, ttl_seconds, max_sessions)
+    if backend == "memory":
+        return MemorySessionStore(ttl_seconds, max_sessions, max_bytes)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,231 @@
+"""Per-cohort aggregates over every student profile fetched so far.
+
+Class-level views (average quiz score per batch, unpaid fees per course)
+would otherwise mean fetching every student in the class. Instead, each
+profile the service parses, for a question or during a prefetch, updates
+one row of its cohort's columns here. Cohorts are keyed by
+(course_name, batch_name) and the columns are NumPy arrays, so a summary
+is a handful of vectorised reductions and never calls the LMS.
+
+A summary only covers the students fetched so far; `students` and
+`oldest_data_seconds` in every summary say how much that is.
+"""
+import threading
+import time
+
+import numpy as np
+
+UNKNOWN = "N/A"  # course or batch missing from the profile
+
+COLUMNS = (
+    "quiz_average", "quiz_percent", "quizzes_completed", "quizzes_total",
+    "assignment_percent", "assignments_completed", "assignments_total",
+    "paid_count", "unpaid_count", "unpaid_amount", "updated_at",
+)
+GROUP_BY = ("cohort", "course", "batch")
+
+
+def cohort_key(model) -> tuple:
+    profile = model.profile
+    return ((profile and profile.course_name) or UNKNOWN, (profile and profile.batch_name) or UNKNOWN)
+
+
+def student_row(model) -> dict:
+    """One student's column values (NaN where there are no marks yet)"""
+    quizzes = model.completed_quizzes
+    quiz_marks = sum(q.marks or 0 for q in quizzes)
+    assignments = [a for a in model.assignments if a.completed]
+    assignment_marks = sum(a.total_marks or 0 for a in assignments)
+    return {
+        "quiz_average": np.nan if model.quiz_average is None else model.quiz_average,
+        "quiz_percent": 100 * sum(q.obtained for q in quizzes) / quiz_marks if quiz_marks else np.nan,
+        "quizzes_completed": model.quizzes_completed,
+        "quizzes_total": model.quizzes_total,
+        "assignment_percent": (100 * sum(a.obtained for a in assignments) / assignment_marks
+                               if assignment_marks else np.nan),
+        "assignments_completed": model.assignments_completed,
+        "assignments_total": model.assignments_total,
+        "paid_count": model.paid_count,
+        "unpaid_count": model.unpaid_count,
+        "unpaid_amount": model.unpaid_amount,
+        "updated_at": time.time(),
+    }
+
+
+class _Cohort:
+    """Columns for one (course, batch); rows are packed, removal swaps in the last row"""
+    __slots__ = ("student_ids", "rows", "columns")
+
+    def __init__(self, capacity=16):
+        self.student_ids = []
+        self.rows = {}  # student_id -> row
+        self.columns = {name: np.full(capacity, np.nan) for name in COLUMNS}
+
+    def __len__(self):
+        return len(self.student_ids)
+
+    def set(self, student_id, values):
+        row = self.rows.get(student_id)
+        if row is None:
+            row = len(self.student_ids)
+            if row == len(self.columns["updated_at"]):
+                for name, column in self.columns.items():
+                    grown = np.full(2 * row, np.nan)
+                    grown[:row] = column
+                    self.columns[name] = grown
+            self.rows[student_id] = row
+            self.student_ids.append(student_id)
+        for name, value in values.items():
+            self.columns[name][row] = value
+
+    def remove(self, student_id):
+        row = self.rows.pop(student_id)
+        last = len(self.student_ids) - 1
+        if row != last:
+            moved = self.student_ids[last]
+            self.student_ids[row] = moved
+            self.rows[moved] = row
+            for column in self.columns.values():
+                column[row] = column[last]
+        self.student_ids.pop()
+
+    def view(self) -> dict:
+        return {name: column[:len(self.student_ids)] for name, column in self.columns.items()}
+
+
+def _number(value, digits=2):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def _mean(values):
+    values = values[~np.isnan(values)]
+    return _number(values.mean()) if len(values) else None
+
+
+def _rate(done, total):
+    total = total.sum()
+    return round(float(done.sum() / total), 4) if total else None
+
+
+def summarize(columns) -> dict:
+    """Aggregates over a set of student rows (dict of equal-length column arrays)"""
+    quiz = columns["quiz_average"]
+    scored = quiz[~np.isnan(quiz)]
+    unpaid = columns["unpaid_count"]
+    updated = columns["updated_at"]
+    quartiles = np.percentile(scored, [25, 50, 75]) if len(scored) else [None] * 3
+    return {
+        "students": len(quiz),
+        "quiz_average": {
+            "students_with_scores": len(scored),
+            "mean": _mean(scored),
+            "p25": _number(quartiles[0]),
+            "median": _number(quartiles[1]),
+            "p75": _number(quartiles[2]),
+            "min": _number(scored.min()) if len(scored) else None,
+            "max": _number(scored.max()) if len(scored) else None,
+        },
+        "quiz_percent_mean": _mean(columns["quiz_percent"]),
+        "quiz_completion_rate": _rate(columns["quizzes_completed"], columns["quizzes_total"]),
+        "assignment_percent_mean": _mean(columns["assignment_percent"]),
+        "assignment_completion_rate": _rate(columns["assignments_completed"], columns["assignments_total"]),
+        "fees": {
+            "students_with_unpaid": int((unpaid > 0).sum()),
+            "paid_invoices": int(columns["paid_count"].sum()),
+            "unpaid_invoices": int(unpaid.sum()),
+            "unpaid_amount": _number(columns["unpaid_amount"].sum()),
+        },
+        "oldest_data_seconds": _number(time.time() - updated.min(), 1) if len(updated) else None,
+    }
+
+
+class CohortIndex:
+    """Columnar per-(course, batch) aggregates, updated one profile at a time"""
+
+    def __init__(self):
+        self._cohorts = {}  # (course, batch) -> _Cohort
+        self._keys = {}     # student_id -> (course, batch)
+        self._lock = threading.Lock()
+        self._counters = {"updates": 0, "moves": 0}
+
+    def update(self, student_id, model):
+        """Add or refresh a student's row (moving it if the course or batch changed)"""
+        key = cohort_key(model)
+        values = student_row(model)
+        with self._lock:
+            self._counters["updates"] += 1
+            old_key = self._keys.get(student_id)
+            if old_key is not None and old_key != key:
+                self._counters["moves"] += 1
+                self._drop(student_id, old_key)
+            cohort = self._cohorts.get(key)
+            if cohort is None:
+                cohort = self._cohorts[key] = _Cohort()
+            cohort.set(student_id, values)
+            self._keys[student_id] = key
+
+    def _drop(self, student_id, key):
+        cohort = self._cohorts[key]
+        cohort.remove(student_id)
+        del self._keys[student_id]
+        if not len(cohort):
+            del self._cohorts[key]
+
+    def _select(self, course=None, batch=None) -> dict:
+        """(course, batch) -> copies of the matching cohorts' columns"""
+        with self._lock:
+            return {
+                key: {name: column.copy() for name, column in cohort.view().items()}
+                for key, cohort in self._cohorts.items()
+                if (course is None or key[0] == course) and (batch is None or key[1] == batch)
+            }
+
+    def summary(self, course=None, batch=None) -> dict | None:
+        """Aggregates over every fetched student matching the filters, or None if there are none"""
+        selected = self._select(course, batch)
+        if not selected:
+            return None
+        return summarize({name: np.concatenate([columns[name] for columns in selected.values()])
+                          for name in COLUMNS})
+
+    def breakdown(self, by="cohort", course=None, batch=None) -> list:
+        """One summary per course, per batch or per (course, batch)"""
+        groups = {}
+        for (key_course, key_batch), columns in self._select(course, batch).items():
+            group = {"cohort": (key_course, key_batch), "course": (key_course,), "batch": (key_batch,)}[by]
+            groups.setdefault(group, []).append(columns)
+        labels = {"cohort": ("course", "batch"), "course": ("course",), "batch": ("batch",)}[by]
+        return [
+            {**dict(zip(labels, group)),
+             **summarize({name: np.concatenate([columns[name] for columns in members]) for name in COLUMNS})}
+            for group, members in sorted(groups.items())
+        ]
+
+    def compare(self, student_id) -> dict | None:
+        """Where a student's quiz average sits within their own cohort"""
+        with self._lock:
+            key = self._keys.get(student_id)
+            if key is None:
+                return None
+            cohort = self._cohorts[key]
+            quiz = cohort.view()["quiz_average"].copy()
+            own = quiz[cohort.rows[student_id]]
+        scored = quiz[~np.isnan(quiz)]
+        return {
+            "course": key[0],
+            "batch": key[1],
+            "students": len(quiz),
+            "quiz_average_mean": _mean(scored),
+            # Share of scored classmates at or below this student's average
+            "quiz_average_percentile": None if np.isnan(own) else round(float((scored <= own).mean() * 100), 1),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cohorts": len(self._cohorts),
+                "students": len(self._keys),
+                "bytes": sum(column.nbytes for cohort in self._cohorts.values()
+                             for column in cohort.columns.values()),
+                **self._counters,
+            }
@@ -0,0 +1,327 @@
+"""Relevance-ranked, token-budgeted prompt context.
+
+A profile is flattened once into short text records (one per assignment,
+quiz, lecture note, video, invoice, announcement, ...). For each question
+the records are scored by the sections the question is about, word overlap
+with the question, recency and due-date proximity, and the best ones are
+packed into a token budget. Everything that did not fit is reported as
+tokens saved.
+
+Lecture notes, videos, announcements and news can also be ranked by a
+retrieval index (see retrieval_index.py); only the top hits of those
+sections then reach the prompt.
+"""
+import heapq
+import os
+import re
+import sys
+import threading
+from datetime import date
+from functools import lru_cache
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+_TERM_RE = re.compile(r"[a-z0-9]+")
+
+# Render order and headings (same headings format_profile has always used)
+SECTION_TITLES = {
+    "assignments": "📚 Assignments:",
+    "quizzes": "📝 Quizzes:",
+    "lecture_notes": "📄 Lecture Notes:",
+    "video_tutorials": "🎥 Video Tutorials:",
+    "fees": "💰 Fee Status:",
+    "announcements": "📢 Announcements:",
+    "news": "📰 News:",
+    "help_support": "🛟 Help & Support:",
+}
+
+# Router sections -> record sections they cover
+SECTION_GROUPS = {
+    "lectures": ("lecture_notes", "video_tutorials"),
+}
+
+# Course material searched through the retrieval index rather than listed in full
+RETRIEVAL_SECTIONS = ("lecture_notes", "video_tutorials", "announcements", "news")
+
+_IGNORED_TERMS = frozenset("a an the is are my me i what how when which where do does did of for to in on and or any".split())
+
+
+def estimate_tokens(text) -> int:
+    """Local token estimate: one per word or symbol, plus one per 6 extra characters"""
+    return sum(1 + (len(piece) - 1) // 6 for piece in _WORD_RE.findall(text))
+
+
+def text_terms(text) -> list:
+    """Lower-cased words of `text` without stop words, in order and with repeats"""
+    return [term for term in _TERM_RE.findall(text.lower()) if term not in _IGNORED_TERMS]
+
+
+def _fmt(value):
+    return "None" if value is None else str(value)
+
+
+def _assignment_text(a):
+    status = f"Scored {a.obtained}/{_fmt(a.total_marks)}" if a.completed else "Pending"
+    return f"{a.title} (Due: {_fmt(a.due)}, Marks: {_fmt(a.total_marks)}, {status})"
+
+
+def _quiz_text(q):
+    status = f"Scored {q.obtained}/{_fmt(q.marks)}" if q.completed else "Not attempted"
+    return f"{q.title} (Marks: {_fmt(q.marks)}, Due: {_fmt(q.due)}, {status})"
+
+
+def _notice_text(item):
+    return f"{item.title} ({item.date})" if item.date else item.title
+
+
+# Record kind -> (section, text, date, pending) for the model item behind it
+_KINDS = {
+    "assignment": ("assignments", _assignment_text, lambda a: a.due, lambda a: not a.completed),
+    "quiz": ("quizzes", _quiz_text, lambda q: q.due, lambda q: not q.completed),
+    "lecture_note": ("lecture_notes", lambda n: f"{n.title} (Date: {_fmt(n.date)})", lambda n: n.date, None),
+    "video": ("video_tutorials", lambda v: f"{v.title} (Date: {_fmt(v.date)})", lambda v: v.date, None),
+    "paid": ("fees", lambda f: f"Paid: {_fmt(f.amount)} on {_fmt(f.date)} (Receipt: {_fmt(f.reference)})",
+             lambda f: f.date, None),
+    "unpaid": ("fees", lambda f: f"Unpaid: {_fmt(f.amount)} due {_fmt(f.date)}", lambda f: f.date, lambda f: True),
+    "announcements": ("announcements", _notice_text, lambda n: n.date, None),
+    "news": ("news", _notice_text, lambda n: n.date, None),
+    "help_support": ("help_support", _notice_text, lambda n: n.date, None),
+}
+
+
+class ContextRecord:
+    """One line of prompt context: a view over one model item.
+
+    Only the item is kept (it is already in the model), so records add
+    little to a cached profile. The text, its tokens and terms are rendered
+    when needed and memoized in the bounded, process-wide record_view cache.
+    """
+    __slots__ = ("kind", "item")
+
+    def __init__(self, kind, item):
+        self.kind = kind
+        self.item = item
+
+    @property
+    def section(self) -> str:
+        return _KINDS[self.kind][0]
+
+    @property
+    def text(self) -> str:
+        return record_view(self)[2]
+
+    @property
+    def when(self):
+        return record_view(self)[5]
+
+    @property
+    def pending(self) -> bool:
+        return record_view(self)[6]
+
+    @property
+    def tokens(self) -> int:
+        return record_view(self)[3]  # includes the leading "- " bullet
+
+    @property
+    def key(self) -> tuple:
+        """Identifies the same item across students (retrieval index key)"""
+        return record_view(self)[0]
+
+
+RECORD_VIEW_CACHE_SIZE = int(os.getenv("RECORD_VIEW_CACHE_SIZE", "20000"))
+
+
+@lru_cache(maxsize=RECORD_VIEW_CACHE_SIZE)
+def _text_terms(text) -> frozenset:
+    """Terms of a record's text; records with the same text (shared course material) share one set"""
+    return frozenset(sys.intern(term) for term in text_terms(text))
+
+
+@lru_cache(maxsize=RECORD_VIEW_CACHE_SIZE)
+def record_view(record) -> tuple:
+    """(key, section, text, tokens, terms, date, pending) of a record, memoized by identity"""
+    section, render, when, pending = _KINDS[record.kind]
+    text = render(record.item)
+    return ((section, text), section, text, estimate_tokens(text) + 1, _text_terms(text), when(record.item),
+            pending is not None and pending(record.item))
+
+
+# Top-level payload section -> record sections built from it
+PAYLOAD_SECTIONS = {
+    "profile": (),
+    "lms": ("assignments", "quizzes", "lecture_notes", "video_tutorials"),
+    "fee_invoices": ("fees",),
+    "announcements": ("announcements",),
+    "news": ("news",),
+    "help_support": ("help_support",),
+}
+
+_SECTION_POSITION = {name: i for i, name in enumerate(SECTION_TITLES)}
+
+# Record section -> (record kind, model attribute) in render order
+_SECTION_SOURCES = {
+    "assignments": (("assignment", "assignments"),),
+    "quizzes": (("quiz", "quizzes"),),
+    "lecture_notes": (("lecture_note", "lecture_notes"),),
+    "video_tutorials": (("video", "video_tutorials"),),
+    "fees": (("paid", "paid_invoices"), ("unpaid", "unpaid_invoices")),
+    "announcements": (("announcements", "announcements"),),
+    "news": (("news", "news"),),
+    "help_support": (("help_support", "help_support"),),
+}
+
+
+def extract_records(model, sections=None) -> list:
+    """Flatten a StudentModel into context records; done once per fetch.
+
+    `sections` limits it to some top-level payload sections (see PAYLOAD_SECTIONS).
+    """
+    wanted = set(SECTION_TITLES) if sections is None else {
+        name for section in sections for name in PAYLOAD_SECTIONS[section]}
+    records = []
+    for section, sources in _SECTION_SOURCES.items():
+        if section in wanted:
+            for kind, attribute in sources:
+                for item in getattr(model, attribute):
+                    records.append(ContextRecord(kind, item))
+    return records
+
+
+def refresh_records(records, model, sections) -> list:
+    """Keep the records of unchanged payload sections and rebuild those in `sections`"""
+    stale = {name for section in sections for name in PAYLOAD_SECTIONS[section]}
+    kept = [r for r in records if r.section not in stale]
+    merged = kept + extract_records(model, sections)
+    merged.sort(key=lambda r: _SECTION_POSITION[r.section])  # stable: keeps order within a section
+    return merged
+
+
+def _score(view, terms, wanted, today):
+    _, section, _, _, record_terms, when, pending = view
+    if wanted:
+        score = 3.0 if section in wanted else 0.3
+    else:
+        score = 1.0
+    if terms:
+        score += 1.5 * len(terms & record_terms)
+    if when is not None:
+        days = (when - today).days
+        if pending and days >= 0:
+            score += 1.5 / (1 + days / 7)   # due soon
+        elif pending:
+            score += 1.0                    # overdue
+        else:
+            score += 1.0 / (1 + abs(days) / 30)  # recent
+    return score
+
+
+class BuiltContext:
+    __slots__ = ("text", "tokens_used", "tokens_full", "records_used", "records_total")
+
+    def __init__(self, text, tokens_used, tokens_full, records_used, records_total):
+        self.text = text
+        self.tokens_used = tokens_used
+        self.tokens_full = tokens_full
+        self.records_used = records_used
+        self.records_total = records_total
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_full - self.tokens_used)
+
+
+def build_context(records, header="", question="", sections=(), budget=None, today=None,
+                  retrieved=None, top_k=0) -> BuiltContext:
+    """Pack the most relevant records for `question` into `budget` tokens.
+
+    `sections` are router sections ("quizzes", "lectures", ...) the question
+    is about; with no budget every record is included in source order.
+    `retrieved` maps record keys to retrieval scores for the question; when
+    it is given, only the `top_k` best RETRIEVAL_SECTIONS records are used
+    (the matched ones if any matched, and then only with the asked-about
+    sections).
+    """
+    today = today or date.today()
+    wanted = set()
+    for name in sections:
+        wanted.update(SECTION_GROUPS.get(name, (name,)))
+    terms = frozenset(text_terms(question))
+
+    header_tokens = estimate_tokens(header)
+    title_tokens = {name: estimate_tokens(title) for name, title in SECTION_TITLES.items()}
+    views = [record_view(r) for r in records]  # records are kept in render order
+
+    def full_tokens(items):
+        present = {v[1] for v in items}
+        return header_tokens + sum(v[3] for v in items) + sum(title_tokens[s] for s in present)
+
+    def score(view):
+        bonus = retrieved.get(view[0], 0.0) if retrieved else 0.0
+        return _score(view, terms, wanted, today) + bonus
+
+    tokens_full = full_tokens(views)
+    candidates = views
+    if retrieved is not None:
+        material = [v for v in views if v[1] in RETRIEVAL_SECTIONS]
+        matched = [v for v in material if v[0] in retrieved]
+        hits = {id(v) for v in heapq.nlargest(top_k, matched or material, key=score)}
+        # When the question matched some material, other sections it is not about are left out too
+        focused = bool(matched) and bool(wanted)
+        candidates = [
+            v for v in views
+            if (id(v) in hits if v[1] in RETRIEVAL_SECTIONS else not focused or v[1] in wanted)
+        ]
+
+    if budget is None:
+        chosen = list(candidates)
+        used = full_tokens(chosen)
+    else:
+        ranked = sorted(candidates, key=score, reverse=True)
+        chosen, used, opened = [], header_tokens, set()
+        for view in ranked:
+            section, tokens = view[1], view[3]
+            cost = tokens + (0 if section in opened else title_tokens[section])
+            if used + cost > budget:
+                continue
+            chosen.append(view)
+            opened.add(section)
+            used += cost
+
+    picked = {id(v) for v in chosen}
+    by_section = {}
+    for view in views:
+        if id(view) in picked:
+            by_section.setdefault(view[1], []).append(view[2])
+
+    lines = [header] if header else []
+    for section, title in SECTION_TITLES.items():
+        if section in by_section:
+            lines.append(f"\n{title}")
+            lines.extend(f"- {text}" for text in by_section[section])
+
+    return BuiltContext("\n".join(lines), used, tokens_full, len(chosen), len(records))
+
+
+class ContextStats:
+    """Running totals of prompt tokens used and saved by the context builder"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_used = 0
+        self.tokens_saved = 0
+
+    def record(self, built):
+        with self._lock:
+            self.requests += 1
+            self.tokens_used += built.tokens_used
+            self.tokens_saved += built.tokens_saved
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "tokens_used": self.tokens_used,
+                "tokens_saved": self.tokens_saved,
+                "avg_tokens_used": round(self.tokens_used / self.requests, 1) if self.requests else 0.0,
+                "avg_tokens_saved": round(self.tokens_saved / self.requests, 1) if self.requests else 0.0,
+            }
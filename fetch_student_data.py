@@ -1,70 +1,189 @@
-# import requests
-
-# def fetch_student_profile(student_id: str):
-#     url = f"https://lms.prismaticcrm.com/api/student-profile/{student_id}"
-#     try:
-#         response = requests.get(url)
-#         print(f"[DEBUG] Status Code: {response.status_code}")
-#         print(f"[DEBUG] Raw Response: {response.text}")
-
-#         # Try to parse JSON only if there is a body
-#         if response.text.strip() == "":
-#             return {
-#                 "error": f"Empty response body (HTTP {response.status_code})"
-#             }
-
-#         data = response.json()
-
-#         if response.status_code == 200:
-#             return data
-#         else:
-#             return {
-#                 "error": f"Failed to fetch student data: {response.status_code}",
-#                 "response_body": data
-#             }
-
-#     except requests.RequestException as e:
-#         print(f"[ERROR] Request failed: {e}")
-#         return {"error": f"Request error: {e}"}
-#     except Exception as e:
-#         print(f"[ERROR] General error: {e}")
-#         return {"error": f"Unexpected error: {e}"}
-
-
-import requests
-import json
+import os
+import asyncio
+import logging
+import httpx
+from metrics import UPSTREAM_ERRORS, span
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, resilient_call
+from structured_log import payload_summary
+
+log = logging.getLogger("lms.fetch")
+
+STUDENT_API_BASE = os.getenv("STUDENT_API_BASE", "https://lms.prismaticcrm.com/api/student-profile")
+
+# === Connection pool settings ===
+CONNECT_TIMEOUT = float(os.getenv("LMS_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.getenv("LMS_READ_TIMEOUT", "10"))
+POOL_SIZE = int(os.getenv("LMS_POOL_SIZE", "100"))
+
+# === Retries, hedging and circuit breaker ===
+LMS_RETRIES = int(os.getenv("LMS_RETRIES", "2"))
+LMS_HEDGE_AFTER = float(os.getenv("LMS_HEDGE_AFTER", "0")) or None  # seconds before a hedged second request; 0 = off
+RETRY_STATUSES = frozenset({502, 503, 504})
+lms_breaker = CircuitBreaker(
+    "lms",
+    failure_threshold=int(os.getenv("LMS_BREAKER_FAILURES", "5")),
+    reset_seconds=float(os.getenv("LMS_BREAKER_RESET", "30")),
+)
+
+class UpstreamUnavailable(Exception):
+    """A 502/503/504 from the LMS, raised so it is retried and counted by the breaker"""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+# Shared keep-alive session for the sync path; `requests` is only imported if it is used
+_session = None
+
+def get_session():
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _session = requests.Session()
+        _session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE))
+        _session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE))
+    return _session
+
+# Shared async client, created on first use inside the running event loop
+_async_client = None
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+        )
+    return _async_client
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+def profile_url(student_id: str) -> str:
+    return f"{STUDENT_API_BASE}/{student_id}"
+
+def _parse_profile_response(response, student_id=None):
+    """Turn a requests/httpx response into profile data or an error dict"""
+    content_type = response.headers.get("Content-Type", "")
+    if "application/json" not in content_type:
+        UPSTREAM_ERRORS.inc("invalid_response")
+        log.warning("profile response is not JSON", extra={
+            "student_id": student_id, "status": response.status_code, "content_type": content_type})
+        return {
+            "error": "Invalid response format: expected JSON",
+            "raw_body": response.text
+        }
+
+    if not response.content.strip():
+        UPSTREAM_ERRORS.inc("empty_response")
+        log.warning("empty profile response", extra={"student_id": student_id, "status": response.status_code})
+        return {"error": f"Empty response body (HTTP {response.status_code})"}
+
+    data = response.json()
+    # Only a bounded summary of the body, and only when debug logging is on
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("profile response", extra={
+            "student_id": student_id, "status": response.status_code,
+            "payload": payload_summary(data, len(response.content))})
+
+    if response.status_code == 200:
+        return data
+    else:
+        UPSTREAM_ERRORS.inc(f"http_{response.status_code}")
+        log.warning("profile fetch failed", extra={"student_id": student_id, "status": response.status_code})
+        return {
+            "error": f"Failed to fetch student data: {response.status_code}",
+            "response_body": data
+        }
 
 def fetch_student_profile(student_id: str):
-    url = f"https://lms.prismaticcrm.com/api/student-profile/{student_id}"
+    import requests
+    if not lms_breaker.allow():
+        UPSTREAM_ERRORS.inc("circuit_open")
+        return {"error": "LMS unavailable: circuit is open", "unavailable": True}
     try:
-        response = requests.get(url)
-        print(f"[DEBUG] Status Code: {response.status_code}")
-        print(f"[DEBUG] Content-Type: {response.headers.get('Content-Type')}")
-
-        if "application/json" not in response.headers.get("Content-Type", ""):
-            return {
-                "error": "Invalid response format: expected JSON",
-                "raw_body": response.text
-            }
-
-        if response.text.strip() == "":
-            return {"error": f"Empty response body (HTTP {response.status_code})"}
-
-        data = response.json()
-        print("[DEBUG] Full JSON response:")
-        print(json.dumps(data, indent=2))  # Pretty print for dev logs
-
-        if response.status_code == 200:
-            return data
-        else:
-            return {
-                "error": f"Failed to fetch student data: {response.status_code}",
-                "response_body": data
-            }
+        with span("fetch"):
+            response = get_session().get(profile_url(student_id), timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        if response.status_code in RETRY_STATUSES:
+            lms_breaker.record_failure()
+            return {**_parse_profile_response(response, student_id), "unavailable": True}
+        lms_breaker.record_success()
+        return _parse_profile_response(response, student_id)
 
     except requests.RequestException as e:
-        print(f"[ERROR] Request failed: {e}")
-        return {"error": f"Request error: {e}"}
+        lms_breaker.record_failure()
+        UPSTREAM_ERRORS.inc("timeout" if isinstance(e, requests.Timeout) else "connection")
+        log.warning("profile request failed", extra={"student_id": student_id, "error": str(e)})
+        return {"error": f"Request error: {e}", "unavailable": True}
     except Exception as e:
-        print(f"[ERROR] General error: {e}")
+        UPSTREAM_ERRORS.inc("unexpected")
+        log.exception("unexpected error fetching profile", extra={"student_id": student_id})
         return {"error": f"Unexpected error: {e}"}
+
+def response_validators(response) -> dict:
+    """ETag / Last-Modified of a response, as keyword arguments for the next conditional fetch"""
+    validators = {}
+    if response.headers.get("ETag"):
+        validators["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validators["last_modified"] = response.headers["Last-Modified"]
+    return validators
+
+async def async_fetch_student_profile(student_id: str, retries=None):
+    """Non-blocking variant of fetch_student_profile on the shared async pool"""
+    data, _ = await async_fetch_profile_conditional(student_id, retries=retries)
+    return data
+
+async def async_fetch_profile_conditional(student_id: str, etag=None, last_modified=None, retries=None):
+    """Fetch with If-None-Match / If-Modified-Since when validators are known.
+
+    Returns (data, validators); data is None when the upstream answered
+    304 Not Modified, and an error dict when the fetch failed. Transient
+    failures are retried within the request's deadline; when they persist
+    (or the breaker is open) the error dict has `unavailable` set, so
+    callers can fall back to data they already hold. `retries` overrides
+    LMS_RETRIES for callers that retry on their own (prefetch jobs).
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    async def attempt():
+        response = await get_async_client().get(profile_url(student_id), headers=headers)
+        if response.status_code in RETRY_STATUSES:
+            raise UpstreamUnavailable(response)
+        return response
+
+    try:
+        with span("fetch"):
+            response = await resilient_call(
+                attempt, lms_breaker, LMS_RETRIES if retries is None else retries, timeout=CONNECT_TIMEOUT + READ_TIMEOUT,
+                hedge_after=LMS_HEDGE_AFTER, retry_on=(httpx.TransportError, UpstreamUnavailable), name="lms",
+            )
+        if response.status_code == 304:
+            return None, response_validators(response) or {"etag": etag, "last_modified": last_modified}
+        return _parse_profile_response(response, student_id), response_validators(response)
+
+    except UpstreamUnavailable as e:
+        return {**_parse_profile_response(e.response, student_id), "unavailable": True}, {}
+    except CircuitOpenError as e:
+        UPSTREAM_ERRORS.inc("circuit_open")
+        return {"error": f"LMS unavailable: {e}", "unavailable": True}, {}
+    except (DeadlineExceeded, asyncio.TimeoutError) as e:
+        UPSTREAM_ERRORS.inc("timeout")
+        log.warning("profile request timed out", extra={"student_id": student_id, "error": repr(e)})
+        return {"error": "Request error: LMS request timed out", "unavailable": True}, {}
+    except httpx.HTTPError as e:
+        UPSTREAM_ERRORS.inc("timeout" if isinstance(e, httpx.TimeoutException) else "connection")
+        log.warning("profile request failed", extra={"student_id": student_id, "error": str(e)})
+        return {"error": f"Request error: {e}", "unavailable": True}, {}
+    except Exception as e:
+        UPSTREAM_ERRORS.inc("unexpected")
+        log.exception("unexpected error fetching profile", extra={"student_id": student_id})
+        return {"error": f"Unexpected error: {e}"}, {}
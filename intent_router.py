@@ -0,0 +1,172 @@
+"""Keyword intent classifier shared by /ask and /query.
+
+Keyword phrases are compiled once into a token trie. A question is tokenized
+once, each token is mapped onto the keyword vocabulary (exact, then plural
+folding, then a one-edit spelling correction), and the trie is walked from
+every position so multiword phrases and several intents per question are
+all picked up in a single pass.
+"""
+import re
+from functools import lru_cache
+
+# === Intents ===
+FEE_STATUS = "fee_status"
+ASSIGNMENT_STATUS = "assignment_status"
+QUIZ_SCORES = "quiz_scores"
+LECTURES = "lectures"
+ANNOUNCEMENTS = "announcements"
+NEWS = "news"
+HELP_SUPPORT = "help_support"
+PROFILE = "profile"
+RAW_DETAIL = "raw_detail"  # needs a field the context index leaves out
+
+INTENT_KEYWORDS = {
+    QUIZ_SCORES: ["quiz", "test", "score", "grade", "marks", "result", "average", "performance"],
+    ASSIGNMENT_STATUS: ["assignment", "homework", "submit", "submission", "deadline", "due date",
+                        "pending work", "task"],
+    FEE_STATUS: ["fee", "fees", "payment", "invoice", "paid", "unpaid", "dues", "challan",
+                 "installment", "outstanding balance"],
+    LECTURES: ["lecture", "notes", "video", "tutorial", "lesson", "recording", "topic", "covered"],
+    ANNOUNCEMENTS: ["announcement", "notice", "schedule"],
+    NEWS: ["news", "event"],
+    HELP_SUPPORT: ["support ticket", "complaint", "help desk", "support"],
+    PROFILE: ["course", "class", "batch", "branch", "email", "city", "my name", "profile", "enrolled"],
+    RAW_DETAIL: ["receipt", "invoice id", "invoice number", "ticket id", "date of birth", "dob",
+                 "gender", "exact", "raw", "field", "all details"],
+}
+
+# Cues that make a data question answerable from the numbers alone
+STATUS_CUE = "status_cue"
+ADVICE_CUE = "advice_cue"
+CUE_KEYWORDS = {
+    STATUS_CUE: ["how many", "number of", "count", "status", "pending", "left", "remaining",
+                 "unpaid", "paid", "average", "total", "outstanding"],
+    ADVICE_CUE: ["how can", "how do", "how to", "improve", "why", "explain", "should", "help me",
+                 "tips", "advice", "better"],
+}
+
+# Intents with a deterministic answer (see answer_strategies.DETERMINISTIC_ANSWERS)
+DETERMINISTIC_INTENTS = frozenset({FEE_STATUS, ASSIGNMENT_STATUS, QUIZ_SCORES})
+
+# Words that do not narrow a question down to one item. Any other word that is
+# not a keyword (a number, a month, "recursion", "python") names a specific
+# quiz, assignment or invoice, which the aggregate answers cannot speak to.
+FILLER_WORDS = frozenset("""
+    about all am an any are at attempted be been can check complete completed could current currently did
+    do does done far finished for get got had has have how in is it know let many me much my now of on
+    overall please right show so still submitted taken tell that the there this to want what whats which
+    with yet you your
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_END = "$labels"
+_NO_FOLD = frozenset({"news", "dues", "status", "this", "has", "was", "does"})
+
+
+def fold_token(word):
+    """Fold a lower-cased word's plural onto its singular (quizzes -> quiz, marks -> mark)"""
+    if word.endswith("zzes"):  # quizzes -> quiz
+        return word[:-3]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss") and word not in _NO_FOLD:
+        return word[:-1]
+    return word
+
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class IntentClassifier:
+    """Precompiled trie over keyword token sequences"""
+
+    def __init__(self, keywords, min_fuzzy_length=5):
+        self.min_fuzzy_length = min_fuzzy_length
+        self._trie = {}
+        self._vocab = set()
+        self._delete_index = {}  # one-character deletion -> vocabulary words
+
+        for label, phrases in keywords.items():
+            for phrase in phrases:
+                node = self._trie
+                for token in (fold_token(t) for t in _WORD_RE.findall(phrase.lower())):
+                    self._vocab.add(token)
+                    node = node.setdefault(token, {})
+                node.setdefault(_END, set()).add(label)
+
+        for word in self._vocab:
+            if len(word) >= self.min_fuzzy_length - 1:
+                for variant in _deletes(word) | {word}:
+                    self._delete_index.setdefault(variant, set()).add(word)
+
+        # Per-instance memo so repeated words skip correction entirely
+        self.canonical = lru_cache(maxsize=50000)(self._canonical)
+
+    def _canonical(self, token):
+        """Map a question token onto the keyword vocabulary where possible"""
+        folded = fold_token(token)
+        if folded in self._vocab or len(folded) < self.min_fuzzy_length:
+            return folded
+        candidates = set()
+        for variant in _deletes(folded) | {folded}:
+            candidates |= self._delete_index.get(variant, set())
+        if len(candidates) == 1:
+            return candidates.pop()
+        return folded  # unknown or ambiguous: leave it alone
+
+    def tokenize(self, text):
+        return [self.canonical(t) for t in _WORD_RE.findall(text.lower())]
+
+    def names_item(self, tokens) -> bool:
+        """True if any token is neither a keyword nor a filler word (single letters aside: "what's")"""
+        return any(token not in self._vocab and token not in FILLER_WORDS and (len(token) > 1 or token.isdigit())
+                   for token in tokens)
+
+    def match(self, tokens) -> set:
+        """All labels whose keyword phrase occurs in the token sequence"""
+        labels = set()
+        for start in range(len(tokens)):
+            node = self._trie
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                found = node.get(_END)
+                if found:
+                    labels |= found
+        return labels
+
+
+class Classification:
+    __slots__ = ("intents", "cues", "specific")
+
+    def __init__(self, intents, cues, specific=False):
+        self.intents = intents
+        self.cues = cues
+        self.specific = specific  # names an item (quiz 3, march fee, recursion assignment)
+
+    @property
+    def deterministic(self) -> bool:
+        """One count / status question about a single intent we can answer from the aggregates"""
+        return (
+            len(self.intents) == 1
+            and self.intents[0] in DETERMINISTIC_INTENTS
+            and STATUS_CUE in self.cues
+            and ADVICE_CUE not in self.cues
+            and not self.specific
+        )
+
+    def __repr__(self):
+        return f"Classification(intents={self.intents}, cues={sorted(self.cues)}, specific={self.specific})"
+
+
+_classifier = IntentClassifier({**INTENT_KEYWORDS, **CUE_KEYWORDS})
+
+
+def classify(question) -> Classification:
+    """Tokenize once and return every intent and cue found in the question"""
+    tokens = _classifier.tokenize(question)
+    labels = _classifier.match(tokens)
+    # Order intents as declared so callers get a stable primary intent
+    intents = tuple(name for name in INTENT_KEYWORDS if name in labels)
+    cues = frozenset(name for name in CUE_KEYWORDS if name in labels)
+    return Classification(intents, cues, _classifier.names_item(tokens))
@@ -0,0 +1,60 @@
+"""LangChain callbacks; imported on the first LLM call so startup does not pay for langchain_core"""
+import time
+from langchain_core.callbacks import AsyncCallbackHandler
+from context_builder import estimate_tokens
+from metrics import LLM_CALLS, LLM_TOKENS, observe_stage
+
+
+class LLMCallCounter(AsyncCallbackHandler):
+    """LangChain callback that counts model invocations for one question.
+
+    Also feeds the /metrics counters: LLM call latency and outcome, token
+    usage, and the duration of each JSON agent step.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self._started = {}  # run_id -> (perf_counter, prompt tokens estimate)
+        self._step_start = None
+
+    def _start(self, run_id, prompt_text):
+        self.calls += 1
+        now = time.perf_counter()
+        self._started[run_id] = (now, estimate_tokens(prompt_text))
+        if self._step_start is None:
+            self._step_start = now
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, " ".join(str(m.content) for batch in messages for m in batch))
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, " ".join(prompts))
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        started, prompt_estimate = self._started.pop(run_id, (None, 0))
+        if started is not None:
+            observe_stage("llm", time.perf_counter() - started)
+        LLM_CALLS.inc("ok")
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        text = " ".join(g.text for batch in response.generations for g in batch)
+        LLM_TOKENS.inc("prompt", amount=usage.get("prompt_tokens") or prompt_estimate)
+        LLM_TOKENS.inc("completion", amount=usage.get("completion_tokens") or estimate_tokens(text))
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        started, _ = self._started.pop(run_id, (None, 0))
+        if started is not None:
+            observe_stage("llm", time.perf_counter() - started)
+        LLM_CALLS.inc("error")
+
+    async def on_agent_action(self, action, **kwargs):
+        self._end_step()
+
+    async def on_agent_finish(self, finish, **kwargs):
+        self._end_step()
+
+    def _end_step(self):
+        # One agent step: the model call that chose the action plus any tool run before it
+        now = time.perf_counter()
+        if self._step_start is not None:
+            observe_stage("agent_step", now - self._step_start)
+        self._step_start = now
@@ -0,0 +1,240 @@
+"""Admission control and adaptive concurrency for LLM calls.
+
+Every LLM call takes a slot from the shared LLMScheduler first. Slots are
+granted in priority order (interactive before batch) while the number of
+calls in flight is under the concurrency limit and the request / token
+buckets allow it. The limit adapts AIMD style: it doubles every round of
+successful calls until the first cut (slow start), then grows by about
+one per round, and is halved when the provider answers 429
+(and cut by 10% when calls get slower than the latency target).
+
+When the queue is full, or the expected wait is longer than the caller
+can afford (its deadline or `max_wait`), the call is refused at once with
+`Overloaded`, so the caller can answer without the LLM instead of timing
+out in the queue.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+
+from metrics import (
+    LLM_CONCURRENCY_LIMIT, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT, LLM_RATE_LIMITED, LLM_SHED,
+)
+from resilience import time_left
+
+INTERACTIVE = 0  # /ask, /chat, streaming
+BATCH = 1        # /ask/batch
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+class Overloaded(Exception):
+    """The scheduler refused an LLM call (queue full or wait too long)"""
+
+    def __init__(self, reason):
+        super().__init__(f"LLM overloaded: {reason}")
+        self.reason = reason
+
+
+def is_rate_limited(error) -> bool:
+    """Whether an exception from the LLM client is a 429 from the provider"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "RateLimit" in type(error).__name__
+
+
+class TokenBucket:
+    """`rate` units per second, bursting up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount) -> float:
+        """Seconds until `amount` units are available (0 when they are now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class LLMScheduler:
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=64, queue_size=200, max_wait=10.0,
+                 requests_per_minute=0, tokens_per_minute=0, latency_target=8.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.latency_target = latency_target
+        self.limit = float(initial_limit)
+        self.requests = TokenBucket(requests_per_minute / 60, max(1, requests_per_minute / 10)) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute / 60, max(1, tokens_per_minute / 10)) if tokens_per_minute else None
+        self._queue = []  # heap of (priority, seq, entry); entry = [future, tokens, enqueued_at]
+        self._seq = itertools.count()
+        self._waiting = 0
+        self._in_flight = 0
+        self._timer = None
+        self._avg_latency = 1.0  # EWMA of call seconds, for the expected-wait estimate
+        self._last_decrease = 0.0
+        self._slow_start = True
+        self._counters = {"granted": 0, "shed": 0, "rate_limited": 0, "slow": 0}
+        self._update_gauges()
+
+    # === Slots ===
+    @asynccontextmanager
+    async def slot(self, priority=INTERACTIVE, tokens=0):
+        """Hold one concurrency slot for the enclosed LLM call(s)"""
+        await self.acquire(priority, tokens)
+        start = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.release(time.monotonic() - start, ok)
+
+    async def acquire(self, priority=INTERACTIVE, tokens=0):
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        if not self._waiting and self._in_flight < int(self.limit) and self._bucket_wait(tokens) == 0:
+            self._grant(tokens)
+            LLM_QUEUE_WAIT.observe(0.0, name)
+            return
+
+        if self._waiting >= self.queue_size:
+            self._shed("queue_full")
+        budget = self.max_wait
+        left = time_left()
+        if left is not None:
+            budget = min(budget, left)
+        if self.expected_wait(priority, tokens) > budget:
+            self._shed("expected_wait")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [future, tokens, time.monotonic()]
+        heapq.heappush(self._queue, (priority, next(self._seq), entry))
+        self._waiting += 1
+        self._update_gauges()
+        try:
+            await asyncio.wait_for(future, budget)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                self.release(0.0, False, feedback=False)  # granted just as we gave up
+            else:
+                self._waiting -= 1
+                self._update_gauges()
+            if isinstance(e, asyncio.TimeoutError):
+                self._shed("queue_timeout")
+            raise
+        LLM_QUEUE_WAIT.observe(time.monotonic() - entry[2], name)
+
+    def release(self, seconds, ok, feedback=True):
+        self._in_flight -= 1
+        if feedback and ok:
+            self._avg_latency = 0.8 * self._avg_latency + 0.2 * seconds
+            if seconds > self.latency_target:
+                self._counters["slow"] += 1
+                self._decrease(0.9)
+            elif self._waiting or self._in_flight + 1 >= int(self.limit):
+                # Only grow while the limit is what holds calls back
+                step = 1 if self._slow_start else 1 / self.limit
+                self.limit = min(self.max_limit, self.limit + step)
+        self._dispatch()
+
+    def rate_limited(self):
+        """Report a 429 from the provider: halve the concurrency limit"""
+        self._counters["rate_limited"] += 1
+        LLM_RATE_LIMITED.inc()
+        self._decrease(0.5)
+
+    def expected_wait(self, priority=INTERACTIVE, tokens=0) -> float:
+        """Rough seconds a new call of this priority would wait for its slot"""
+        ahead = sum(1 for p, _, entry in self._queue if p <= priority and not entry[0].done())
+        wait = 0.0
+        if ahead or self._in_flight >= int(self.limit):
+            wait = (ahead + 1) / max(1, int(self.limit)) * self._avg_latency
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(ahead + 1))
+        return max(wait, self._bucket_wait(tokens))
+
+    # === Internals ===
+    def _bucket_wait(self, tokens) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = self.requests.wait_time(1)
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+
+    def _grant(self, tokens):
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None and tokens:
+            self.tokens.take(tokens)
+        self._in_flight += 1
+        self._counters["granted"] += 1
+        self._update_gauges()
+
+    def _dispatch(self):
+        while self._queue and self._in_flight < int(self.limit):
+            _, _, entry = self._queue[0]
+            future, tokens, _ = entry
+            if future.done():  # caller gave up
+                heapq.heappop(self._queue)
+                continue
+            wait = self._bucket_wait(tokens)
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(wait, self._on_timer)
+                break
+            heapq.heappop(self._queue)
+            self._waiting -= 1
+            self._grant(tokens)
+            future.set_result(None)
+        self._update_gauges()
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _decrease(self, factor):
+        # One cut per round trip, so a burst of 429s from the same window halves the limit once
+        now = time.monotonic()
+        if now - self._last_decrease < self._avg_latency:
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self.limit = max(self.min_limit, self.limit * factor)
+        self._update_gauges()
+
+    def _shed(self, reason):
+        self._counters["shed"] += 1
+        LLM_SHED.inc(reason)
+        raise Overloaded(reason)
+
+    def _update_gauges(self):
+        LLM_QUEUE_DEPTH.set(self._waiting)
+        LLM_IN_FLIGHT.set(self._in_flight)
+        LLM_CONCURRENCY_LIMIT.set(round(self.limit, 2))
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self._in_flight,
+            "queued": self._waiting,
+            "queue_size": self.queue_size,
+            "max_wait_seconds": self.max_wait,
+            "avg_call_seconds": round(self._avg_latency, 3),
+            "requests_per_minute": self.requests.rate * 60 if self.requests else None,
+            "tokens_per_minute": self.tokens.rate * 60 if self.tokens else None,
+            **self._counters,
+        }
@@ -0,0 +1,175 @@
+"""In-process counters, latency histograms and per-request stage timings.
+
+Everything is rendered in the Prometheus text format by `render()` (served
+at /metrics). Stage timings recorded with `span()` also go into the current
+request's breakdown, which the API can return as a Server-Timing header.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds; covers cache hits (sub-millisecond) up to slow agent runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+_request_timings = ContextVar("request_timings", default=None)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, seconds, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[-1] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, hits in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {hits}")
+                lines.append(f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# === Metrics ===
+REQUEST_SECONDS = Histogram("lms_request_seconds", "HTTP request latency", ("method", "path", "status"))
+STAGE_SECONDS = Histogram("lms_stage_seconds", "Time spent per answer pipeline stage", ("stage",))
+LLM_CALLS = Counter("lms_llm_calls_total", "LLM invocations", ("outcome",))
+LLM_TOKENS = Counter("lms_llm_tokens_total", "LLM tokens (provider usage, else local estimate)", ("type",))
+AGENT_FALLBACKS = Counter("lms_agent_fallbacks_total", "JSON agent runs that fell back to a direct answer", ("reason",))
+UPSTREAM_ERRORS = Counter("lms_upstream_errors_total", "Failed student-profile fetches", ("kind",))
+PROFILE_REFRESHES = Counter("lms_profile_refreshes_total", "Profile loads by outcome (full, not_modified, unchanged, partial)", ("result",))
+SECTIONS_REBUILT = Counter("lms_profile_sections_rebuilt_total", "Payload sections re-parsed on a partial refresh", ("section",))
+REQUEST_ERRORS = Counter("lms_request_errors_total", "Exceptions turned into fallback replies or 500s", ("path",))
+UPSTREAM_RETRIES = Counter("lms_upstream_retries_total", "Retried LMS / LLM calls", ("upstream",))
+HEDGED_CALLS = Counter("lms_hedged_calls_total", "Calls that started a second, hedged attempt", ("upstream",))
+BREAKER_EVENTS = Counter("lms_circuit_breaker_events_total", "Circuit breaker state changes and rejected calls", ("breaker", "event"))
+LLM_QUEUE_DEPTH = Gauge("lms_llm_queue_depth", "LLM calls waiting for a scheduler slot")
+LLM_IN_FLIGHT = Gauge("lms_llm_in_flight", "LLM calls holding a scheduler slot")
+LLM_CONCURRENCY_LIMIT = Gauge("lms_llm_concurrency_limit", "Current adaptive (AIMD) LLM concurrency limit")
+LLM_QUEUE_WAIT = Histogram("lms_llm_queue_wait_seconds", "Time LLM calls waited for a scheduler slot", ("priority",))
+LLM_SHED = Counter("lms_llm_shed_total", "LLM calls refused by admission control", ("reason",))
+LLM_RATE_LIMITED = Counter("lms_llm_rate_limited_total", "LLM calls the provider rejected with 429")
+DEGRADED_ANSWERS = Counter("lms_degraded_answers_total", "Answers served from cached or summary data because an upstream failed", ("reason",))
+
+
+# === Stage timings ===
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def span(stage):
+    """Time a block as one pipeline stage (works around sync and await code alike)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def start_request_timings() -> list:
+    """Begin collecting stage timings for the current request"""
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing(timings, total=None) -> str:
+    """Server-Timing header value; repeated stages (LLM calls, agent steps) are summed"""
+    totals = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
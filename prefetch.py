@@ -0,0 +1,234 @@
+"""Bulk prefetch of student profiles into the serving cache.
+
+Morning traffic hits the LMS API with one cold fetch per student. A
+prefetch job warms the profile cache ahead of the peak: it fetches a list
+of students concurrently with bounded parallelism, a request rate limit and
+retry with exponential backoff, and reports progress and throughput.
+
+Jobs normally run inside the API process (POST /prefetch, or on a daily
+schedule via PREFETCH_IDS_FILE / PREFETCH_AT) so they fill the cache that
+serves requests. The CLI submits a job to a running server, or with
+--local runs one in this process to measure upstream throughput:
+
+    python prefetch.py --ids-file students.csv --batch "Batch 12" --server http://localhost:8000
+    python prefetch.py --ids 101 102 103 --local
+"""
+import argparse
+import asyncio
+import csv
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+
+class RateLimiter:
+    """Async token bucket allowing `rate` acquisitions per second (0 = unlimited)"""
+
+    def __init__(self, rate, burst=None):
+        if rate < 0:
+            raise ValueError(f"rate must be >= 0, got {rate}")
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class PrefetchJob:
+    """Fetch many students with bounded concurrency, rate limiting and retries.
+
+    `loader(student_id)` is an async fetch; `store(student_id, value)` puts a
+    successful result into the cache; `is_ok(value)` tells results worth
+    storing from upstream errors, which are retried. The job is meant to be
+    the only retry layer, so the loader should make a single attempt.
+    """
+
+    def __init__(self, student_ids, loader, store, is_ok=lambda value: True,
+                 concurrency=10, rate=20.0, retries=3, backoff=0.5, max_backoff=10.0):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.student_ids = list(dict.fromkeys(str(s) for s in student_ids))
+        self.loader = loader
+        self.store = store
+        self.is_ok = is_ok
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limiter = RateLimiter(rate)
+
+        self.state = "pending"
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.failures = {}  # student_id -> last error
+        self.started_at = None
+        self.finished_at = None
+        self.task = None  # set by whoever schedules run()
+
+    async def run(self):
+        self.state = "running"
+        self.started_at = time.time()
+        queue = asyncio.Queue()
+        for student_id in self.student_ids:
+            queue.put_nowait(student_id)
+
+        async def worker():
+            while True:
+                try:
+                    student_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._fetch_one(student_id)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(self.student_ids)) or 1)))
+            self.state = "finished"
+        except asyncio.CancelledError:
+            self.state = "cancelled"
+            raise
+        finally:
+            self.finished_at = time.time()
+        return self.progress()
+
+    async def _fetch_one(self, student_id):
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retried += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            await self.rate_limiter.acquire()
+            try:
+                value = await self.loader(student_id)
+            except Exception as e:
+                error = str(e)
+                continue
+            if self.is_ok(value):
+                self.store(student_id, value)
+                self.succeeded += 1
+                return
+            error = (getattr(value, "error", None) or getattr(value, "degraded", None)
+                     or (value.get("error") if isinstance(value, dict) else None))
+        self.failed += 1
+        self.failures[student_id] = error or "unknown error"
+
+    def progress(self) -> dict:
+        done = self.succeeded + self.failed
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.job_id,
+            "state": self.state,
+            "total": len(self.student_ids),
+            "done": done,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retries": self.retried,
+            "percent": round(100 * done / len(self.student_ids), 1) if self.student_ids else 100.0,
+            "elapsed_seconds": round(elapsed, 3),
+            "profiles_per_second": round(done / elapsed, 2) if elapsed else 0.0,
+            "failures": dict(list(self.failures.items())[:20]),
+        }
+
+
+def read_student_ids(path, batch=None):
+    """Student IDs from a file: one per line, or a CSV with student_id[,batch_name] columns"""
+    with open(path, newline="") as f:
+        first_line = f.readline()
+        f.seek(0)
+        if "student_id" in first_line:
+            rows = csv.DictReader(f)
+            return [row["student_id"].strip() for row in rows
+                    if row.get("student_id") and (batch is None or row.get("batch_name", "").strip() == batch)]
+        if batch is not None:
+            raise ValueError("--batch needs a CSV file with student_id and batch_name columns")
+        return [line.strip() for line in f if line.strip()]
+
+
+def seconds_until(clock_time, now=None) -> float:
+    """Seconds from now until the next local HH:MM"""
+    now = now or datetime.now()
+    hour, minute = (int(part) for part in clock_time.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+# === CLI ===
+def _submit_to_server(args, student_ids):
+    import requests
+
+    response = requests.post(f"{args.server.rstrip('/')}/prefetch", timeout=30, json={
+        "student_ids": student_ids,
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "retries": args.retries,
+    })
+    response.raise_for_status()
+    job = response.json()
+    print(f"submitted job {job['job_id']} for {job['total']} students")
+    while job["state"] in ("pending", "running"):
+        time.sleep(args.poll)
+        job = requests.get(f"{args.server.rstrip('/')}/prefetch/{job['job_id']}", timeout=30).json()
+        print(f"{job['percent']:5.1f}%  {job['succeeded']} ok  {job['failed']} failed  "
+              f"{job['profiles_per_second']} profiles/s")
+    return job
+
+
+def _run_locally(args, student_ids):
+    from fetch_student_data import async_fetch_student_profile, close_async_client
+
+    store = {}
+    job = PrefetchJob(student_ids, lambda student_id: async_fetch_student_profile(student_id, retries=0),
+                      store.__setitem__,
+                      is_ok=lambda data: "error" not in data, concurrency=args.concurrency,
+                      rate=args.rate, retries=args.retries)
+
+    async def main():
+        try:
+            return await job.run()
+        finally:
+            await close_async_client()
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--ids", nargs="+", help="student IDs to prefetch")
+    source.add_argument("--ids-file", help="file with one ID per line, or CSV with student_id,batch_name")
+    parser.add_argument("--batch", help="only students in this batch_name (CSV input)")
+    parser.add_argument("--server", default="http://localhost:8000", help="running API to warm")
+    parser.add_argument("--local", action="store_true", help="fetch in this process instead of a server")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=20.0, help="max upstream requests per second")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between progress checks")
+    args = parser.parse_args()
+
+    student_ids = args.ids or read_student_ids(args.ids_file, args.batch)
+    result = _run_locally(args, student_ids) if args.local else _submit_to_server(args, student_ids)
+    print(f"{result['state']}: {result['succeeded']}/{result['total']} warmed, {result['failed']} failed, "
+          f"{result['retries']} retries in {result['elapsed_seconds']}s ({result['profiles_per_second']} profiles/s)")
+    for student_id, error in result["failures"].items():
+        print(f"  {student_id}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from resilience import DeadlineExceeded, deadline_scope, time_left
+
+
+def estimate_size(value) -> int:
+    """Rough byte size of a cached value (length of its JSON encoding)"""
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return 0
+
+
+def deep_sizeof(value, _seen=None) -> int:
+    """Approximate in-memory bytes of an object graph (dicts, sequences, slotted objects)"""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in value)
+    for cls in type(value).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if hasattr(value, name):
+                size += deep_sizeof(getattr(value, name), seen)
+    if hasattr(value, "__dict__"):
+        size += deep_sizeof(vars(value), seen)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "size", "stored_at")
+
+    def __init__(self, value, size, stored_at):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+
+
+class _Flight:
+    """A single in-progress load that concurrent callers wait on"""
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ProfileCache:
+    """In-process TTL + LRU cache for student profiles.
+
+    - Entries younger than `ttl_seconds` are served directly.
+    - Entries older than that but within `stale_seconds` more are served
+      immediately while a single background refresh reloads them.
+    - Concurrent misses for the same key share one loader call, which runs
+      on its own so a cancelled caller does not cancel it for the others.
+    - A load that was in flight when its key was invalidated still answers
+      its callers but does not store its (possibly stale) result.
+    - The cache is bounded by `max_entries` and optionally `max_bytes`;
+      the least recently used entries are evicted first.
+    - An async load (a miss or a background refresh) does not inherit the
+      deadline of the caller that started it; it gets `load_seconds` of its
+      own, and each caller waits for it at most until its own deadline.
+    - `on_evict(key, value)` is called, outside the lock, for every value
+      that leaves the cache (evicted, invalidated or cleared, not replaced)
+      and for a detached load's result, so state kept alongside an entry
+      can be released with it.
+    """
+
+    def __init__(self, ttl_seconds=300, stale_seconds=600, max_entries=1000,
+                 max_bytes=None, should_cache=None, sizer=estimate_size, load_seconds=None,
+                 on_evict=None):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.should_cache = should_cache or (lambda value: True)
+        self.sizer = sizer
+        self.load_seconds = load_seconds
+        self.on_evict = on_evict
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> _Flight for an in-progress load
+        self._ainflight = {}  # key -> asyncio.Future for an in-progress async load
+        self._tasks = set()  # async loads and refreshes, referenced until they finish
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "refreshes": 0,
+            "invalidations": 0,
+        }
+
+    # === Lookup ===
+    def get(self, key, loader):
+        """Return the cached value for `key`, calling `loader(key)` on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry.stored_at
+                if age < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return entry.value
+                if age < self.ttl_seconds + self.stale_seconds:
+                    self._entries.move_to_end(key)
+                    self._counters["stale_hits"] += 1
+                    if key not in self._inflight:
+                        flight = self._inflight[key] = _Flight()
+                        self._counters["refreshes"] += 1
+                        threading.Thread(
+                            target=self._refresh, args=(key, loader, flight), daemon=True
+                        ).start()
+                    return entry.value
+
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                self._counters["misses"] += 1
+                leader = True
+            else:
+                self._counters["coalesced"] += 1
+                leader = False
+
+        if leader:
+            return self._load(key, loader, flight)
+
+        # Another caller is already loading this key; share its result
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    async def aget(self, key, loader):
+        """Async variant of `get`; `loader(key)` must return an awaitable"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry.stored_at
+                if age < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return entry.value
+                if age < self.ttl_seconds + self.stale_seconds:
+                    self._entries.move_to_end(key)
+                    self._counters["stale_hits"] += 1
+                    if key not in self._ainflight:
+                        future = self._ainflight[key] = asyncio.get_running_loop().create_future()
+                        self._counters["refreshes"] += 1
+                        self._spawn(self._aload(key, loader, future))  # failure keeps the stale entry
+                    return entry.value
+
+            future = self._ainflight.get(key)
+            if future is None:
+                future = self._ainflight[key] = asyncio.get_running_loop().create_future()
+                self._counters["misses"] += 1
+                leader = True
+            else:
+                self._counters["coalesced"] += 1
+                leader = False
+
+        if leader:
+            self._spawn(self._aload(key, loader, future))
+
+        # The load runs in its own task; shield it so this caller's cancellation or deadline stays local
+        left = time_left()
+        if left is None:
+            return await asyncio.shield(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(0.0, left))
+        except asyncio.TimeoutError:
+            if future.done():
+                raise  # the loader's own error
+            raise DeadlineExceeded("request deadline exceeded") from None
+
+    def peek(self, key):
+        """Return the cached value for `key` regardless of age, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    # === Loading ===
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _store_loaded(self, key, value, inflight, flight):
+        """Cache a loader result unless the key was invalidated while it loaded"""
+        if not self.should_cache(value):
+            return
+        size = self.sizer(value) if self.max_bytes else 0
+        with self._lock:
+            dropped = self._put(key, value, size) if inflight.get(key) is flight else [(key, value)]
+        self._release(dropped)
+
+    def _load(self, key, loader, flight):
+        try:
+            value = loader(key)
+            self._store_loaded(key, value, self._inflight, flight)
+            flight.value = value
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.done.set()
+
+    def _refresh(self, key, loader, flight):
+        try:
+            self._load(key, loader, flight)
+        except Exception:
+            pass  # Keep serving the stale entry until it expires
+
+    async def _aload(self, key, loader, future):
+        try:
+            with deadline_scope(self.load_seconds, inherit=False):
+                value = await loader(key)
+            self._store_loaded(key, value, self._ainflight, future)
+            future.set_result(value)
+        except asyncio.CancelledError:
+            future.cancel()  # only on shutdown: callers are shielded from each other
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so an unwaited failure is not logged
+        finally:
+            with self._lock:
+                if self._ainflight.get(key) is future:
+                    del self._ainflight[key]
+
+    # === Mutation ===
+    def set(self, key, value):
+        size = self.sizer(value) if self.max_bytes else 0
+        with self._lock:
+            dropped = self._put(key, value, size)
+        self._release(dropped)
+
+    def _put(self, key, value, size) -> list:
+        """Store an entry; returns the (key, value) pairs evicted to make room"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+        self._entries[key] = _Entry(value, size, time.monotonic())
+        self._bytes += size
+        return self._evict()
+
+    def _evict(self) -> list:
+        dropped = []
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes and len(self._entries) > 1)
+        ):
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self._counters["evictions"] += 1
+            dropped.append((key, entry.value))
+        return dropped
+
+    def _release(self, dropped):
+        if self.on_evict is not None:
+            for key, value in dropped:
+                self.on_evict(key, value)
+
+    def invalidate(self, key) -> bool:
+        """Drop `key` from the cache; returns True if it was present.
+
+        A load already in flight for `key` is detached: it still answers its
+        callers, but the next lookup starts a fresh one and its result is
+        not stored.
+        """
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._ainflight.pop(key, None)
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._bytes -= entry.size
+            self._counters["invalidations"] += 1
+        self._release([(key, entry.value)])
+        return True
+
+    def clear(self):
+        with self._lock:
+            dropped = [(key, entry.value) for key, entry in self._entries.items()]
+            self._counters["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._inflight.clear()
+            self._ainflight.clear()
+            self._bytes = 0
+        self._release(dropped)
+
+    # === Reporting ===
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["stale_hits"] + self._counters["misses"]
+            served = self._counters["hits"] + self._counters["stale_hits"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "stale_seconds": self.stale_seconds,
+                "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,225 @@
+"""Deadlines, retries, hedged requests and circuit breakers for upstream calls.
+
+Used by the LMS profile fetch and by the LLM calls. A request's deadline
+is set once (by the API middleware) and every call made while serving it
+gets at most the time that is left. `resilient_call` retries transient
+failures with jittered exponential backoff, can hedge a slow attempt
+with a second concurrent one, and fails fast while the upstream's
+circuit breaker is open.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metrics import BREAKER_EVENTS, HEDGED_CALLS, UPSTREAM_RETRIES
+
+log = logging.getLogger("lms.resilience")
+
+_deadline = ContextVar("deadline", default=None)  # time.monotonic() value
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before the call could finish"""
+
+
+class CircuitOpenError(Exception):
+    """The upstream is failing and calls are being rejected without trying"""
+
+
+# === Deadlines ===
+@contextmanager
+def deadline_scope(seconds, inherit=True):
+    """Give the enclosed calls at most `seconds`; an outer, earlier deadline still wins.
+
+    With `inherit=False` the outer deadline is ignored, for background work
+    that outlives the request that started it. `seconds=None` means no
+    deadline of its own.
+    """
+    deadline = None if seconds is None else time.monotonic() + seconds
+    outer = _deadline.get() if inherit else None
+    if outer is not None and deadline is not None:
+        deadline = min(outer, deadline)
+    token = _deadline.set(outer if deadline is None else deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left():
+    """Seconds until the current deadline, or None when there is none"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def attempt_timeout(timeout=None):
+    """Timeout for one attempt: `timeout` capped by the deadline; raises if none is left"""
+    left = time_left()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return left if timeout is None else min(timeout, left)
+
+
+# === Circuit breaker ===
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, probes again after `reset_seconds`.
+
+    closed -> open when failures reach the threshold; open -> half_open once
+    `reset_seconds` have passed, letting `half_open_calls` probes through;
+    a successful probe closes it, a failed one opens it again.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_seconds=30.0, half_open_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.half_open_calls = half_open_calls
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+        self._counters = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (counts it as a probe when half open)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    self._counters["rejected"] += 1
+                    BREAKER_EVENTS.inc(self.name, "rejected")
+                    return False
+                self._transition(self.HALF_OPEN)
+                self._probes = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes and time.monotonic() - self._probe_at >= self.reset_seconds:
+                    self._probes = 0  # earlier probes never reported back (cancelled); try again
+                if self._probes >= self.half_open_calls:
+                    self._counters["rejected"] += 1
+                    BREAKER_EVENTS.inc(self.name, "rejected")
+                    return False
+                self._probes += 1
+                self._probe_at = time.monotonic()
+            return True
+
+    def is_open(self) -> bool:
+        """Open and not yet due for a probe (does not count as a call)"""
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.reset_seconds
+
+    def record_success(self):
+        with self._lock:
+            self._counters["successes"] += 1
+            self._failures = 0
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._counters["failures"] += 1
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._counters["opened"] += 1
+                self._transition(self.OPEN)
+
+    def _transition(self, state):
+        log.warning("circuit breaker state change",
+                    extra={"breaker": self.name, "from_state": self.state, "to_state": state})
+        self.state = state
+        BREAKER_EVENTS.inc(self.name, state)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self._failures,
+                    "failure_threshold": self.failure_threshold, "reset_seconds": self.reset_seconds,
+                    **self._counters}
+
+
+# === Retries and hedging ===
+def backoff_delay(attempt, base=0.1, cap=2.0) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def _hedged(call, timeout, hedge_after, name):
+    """Run `call()`; if it is still running after `hedge_after` seconds start a second copy.
+
+    The first attempt to succeed wins and the other is cancelled; if both
+    fail the first error is raised.
+    """
+    first = asyncio.ensure_future(asyncio.wait_for(call(), timeout))
+    if hedge_after is None or (timeout is not None and hedge_after >= timeout):
+        return await first
+
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            HEDGED_CALLS.inc(name)
+            remaining = None if timeout is None else max(0.0, timeout - hedge_after)
+            tasks.add(asyncio.ensure_future(asyncio.wait_for(call(), remaining)))
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def resilient_call(call, breaker=None, retries=2, timeout=None, hedge_after=None,
+                         retry_on=(Exception,), backoff_base=0.1, backoff_cap=2.0, name="upstream"):
+    """Await `call()` under the breaker, deadline, retry and hedging policy.
+
+    `call` is a zero-argument coroutine function, invoked once per attempt.
+    Exceptions in `retry_on` are retried (and count against the breaker);
+    anything else is raised at once. Raises CircuitOpenError when the
+    breaker rejects the call and DeadlineExceeded when the request's time
+    runs out.
+    """
+    for attempt in range(retries + 1):
+        this_timeout = attempt_timeout(timeout)
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"{breaker.name} circuit is open")
+        try:
+            result = await _hedged(call, this_timeout, hedge_after, name)
+        except DeadlineExceeded:
+            raise
+        except (asyncio.TimeoutError, *retry_on) as e:
+            if breaker is not None:
+                breaker.record_failure()
+            left = time_left()
+            if attempt == retries or (left is not None and left <= 0):
+                if isinstance(e, asyncio.TimeoutError) and left is not None and left <= 0:
+                    raise DeadlineExceeded("request deadline exceeded") from e
+                raise
+            UPSTREAM_RETRIES.inc(name)
+            delay = backoff_delay(attempt, backoff_base, backoff_cap)
+            if left is not None:
+                delay = min(delay, max(0.0, left))
+            log.info("retrying upstream call",
+                     extra={"upstream": name, "attempt": attempt + 1, "error": repr(e), "delay": round(delay, 3)})
+            await asyncio.sleep(delay)
+            continue
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()  # not worth retrying, but still a failed call
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
@@ -0,0 +1,190 @@
+"""BM25 retrieval over course material, shared by the students of a course.
+
+Lecture notes, video tutorials, announcements and news are the same for
+everyone in a course, so they are indexed once per course instead of being
+listed in every prompt. Each profile refresh diffs the student's material
+against what that student contributed before: new items are added to the
+course index and items no student has any more are dropped, so the index
+is never rebuilt from scratch. A question is scored against the course's
+statistics, but only the student's own records are ranked, and the
+context builder keeps the top hits.
+
+Documents are keyed by a 64-bit hash of their record key, and a student's
+contribution is kept as a compact array of those ids, released when the
+student's profile leaves the cache.
+"""
+import hashlib
+import math
+import threading
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+from context_builder import RECORD_VIEW_CACHE_SIZE, RETRIEVAL_SECTIONS, text_terms
+
+UNKNOWN_COURSE = "N/A"
+
+
+def course_key(model) -> str:
+    return (model.profile and model.profile.course_name) or UNKNOWN_COURSE
+
+
+@lru_cache(maxsize=RECORD_VIEW_CACHE_SIZE)
+def document_id(key) -> int:
+    """64-bit id of a record key (section, text); the same item gets the same id for every student"""
+    section, text = key
+    return int.from_bytes(hashlib.blake2b(f"{section}\n{text}".encode(), digest_size=8).digest(), "big")
+
+
+def _stem(term):
+    """Fold plurals and -ing forms, so "loops" finds "Loop" and "sorting" finds "sort" """
+    for suffix in ("ing", "s"):
+        if term.endswith(suffix) and not term.endswith("ss") and len(term) > len(suffix) + 3:
+            return term[:-len(suffix)]
+    return term
+
+
+def search_terms(text) -> list:
+    return [_stem(term) for term in text_terms(text)]
+
+
+class BM25Index:
+    """Okapi BM25 over short documents, with reference-counted add / discard"""
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs = {}      # document id -> [length, refs, terms]
+        self._postings = {}  # term -> {document id: term frequency}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, key, text) -> bool:
+        """Index a document, or count one more reference to it; True if it is new"""
+        doc = self._docs.get(key)
+        if doc is not None:
+            doc[1] += 1
+            return False
+        counts = Counter(search_terms(text))
+        length = sum(counts.values())
+        self._docs[key] = [length, 1, tuple(counts)]
+        self._total_length += length
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[key] = count
+        return True
+
+    def discard(self, key) -> bool:
+        """Drop one reference to a document; True if that removed it from the index"""
+        doc = self._docs[key]
+        doc[1] -= 1
+        if doc[1]:
+            return False
+        del self._docs[key]
+        self._total_length -= doc[0]
+        for term in doc[2]:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+        return True
+
+    def scores(self, terms, keys) -> dict:
+        """BM25 score of each of `keys` that matches any of `terms`"""
+        n = len(self._docs)
+        if not n:
+            return {}
+        avg_length = self._total_length / n or 1
+        weighted = []
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if postings:
+                weighted.append((postings, math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))))
+        scores = {}
+        for key in keys:
+            doc = self._docs.get(key)
+            if doc is None:
+                continue
+            norm = self.k1 * (1 - self.b + self.b * doc[0] / avg_length)
+            score = 0.0
+            for postings, idf in weighted:
+                count = postings.get(key)
+                if count:
+                    score += idf * count * (self.k1 + 1) / (count + norm)
+            if score:
+                scores[key] = score
+        return scores
+
+    def terms(self) -> int:
+        return len(self._postings)
+
+
+class RetrievalIndex:
+    """Course name -> BM25Index over that course's material"""
+
+    def __init__(self):
+        self._courses = {}
+        self._students = {}  # student_id -> (course, array of sorted material document ids)
+        self._lock = threading.Lock()
+        self._counters = {"updates": 0, "documents_added": 0, "documents_dropped": 0, "removals": 0,
+                          "searches": 0}
+
+    def update(self, student_id, course, records):
+        """Sync the course index with a student's current material records"""
+        material = {document_id(r.key): r.text for r in records if r.section in RETRIEVAL_SECTIONS}
+        ids = array("Q", sorted(material))
+        with self._lock:
+            old_course, old_ids = self._students.get(student_id, (None, array("Q")))
+            if old_course == course and old_ids == ids:
+                return
+            self._counters["updates"] += 1
+            old_ids = set(old_ids)
+            if old_course is not None:
+                self._discard(old_course, old_ids - material.keys() if old_course == course else old_ids)
+            index = self._courses.get(course)
+            if index is None:
+                index = self._courses[course] = BM25Index()
+            for doc in (material.keys() - old_ids if old_course == course else material.keys()):
+                self._counters["documents_added"] += index.add(doc, material[doc])
+            self._students[student_id] = (course, ids)
+
+    def remove(self, student_id) -> bool:
+        """Drop a student's material references; True if the student was indexed"""
+        with self._lock:
+            entry = self._students.pop(student_id, None)
+            if entry is None:
+                return False
+            self._counters["removals"] += 1
+            self._discard(*entry)
+            return True
+
+    def _discard(self, course, ids):
+        index = self._courses[course]
+        for doc in ids:
+            self._counters["documents_dropped"] += index.discard(doc)
+        if not len(index):
+            del self._courses[course]
+
+    def has(self, student_id) -> bool:
+        return student_id in self._students
+
+    def scores(self, course, question, records) -> dict:
+        """Record key -> BM25 score for the material among `records` that matches `question`"""
+        keys = {document_id(r.key): r.key for r in records if r.section in RETRIEVAL_SECTIONS}
+        terms = search_terms(question)
+        with self._lock:
+            self._counters["searches"] += 1
+            index = self._courses.get(course)
+            scores = index.scores(terms, keys) if index is not None and terms else {}
+        return {keys[doc]: score for doc, score in scores.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "courses": len(self._courses),
+                "students": len(self._students),
+                "documents": sum(len(index) for index in self._courses.values()),
+                "terms": sum(index.terms() for index in self._courses.values()),
+                **self._counters,
+            }
@@ -0,0 +1,58 @@
+import asyncio
+import json
+from fastapi.responses import StreamingResponse
+
+from resilience import attempt_timeout
+
+# Disable proxy buffering so tokens reach the chat widget as they are produced
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def wants_event_stream(request) -> bool:
+    """True when the client asked for Server-Sent Events"""
+    return "text/event-stream" in request.headers.get("accept", "")
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def status_event(message: str) -> str:
+    return sse_event("status", {"message": message})
+
+async def stream_tokens(runnable, llm_input, on_done=None, config=None, timeout=None, on_error=None):
+    """Yield a `token` event per chunk from a LangChain model or chain, then `done`.
+
+    `on_done(answer)` is called with the full text once the stream completes;
+    `config` is passed to astream (e.g. callbacks). The whole stream gets at
+    most `timeout` seconds, capped by the request deadline, after which an
+    `error` event is sent instead of `done`. Any other failure also ends
+    the stream with `error`; `on_error(exc)` sees the exception first
+    (e.g. to back off on a 429).
+    """
+    parts = []
+    try:
+        limit = attempt_timeout(timeout)
+        deadline = None if limit is None else asyncio.get_running_loop().time() + limit
+        chunks = aiter(runnable.astream(llm_input, config=config))
+        while True:
+            # Only the wait for the next chunk is timed, never the consumer's side of a yield
+            try:
+                async with asyncio.timeout_at(deadline):
+                    chunk = await anext(chunks)
+            except StopAsyncIteration:
+                break
+            text = getattr(chunk, "content", chunk)
+            if text:
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+    except Exception as e:
+        if on_error is not None:
+            on_error(e)
+        yield sse_event("error", {"message": "The assistant stopped responding. Please try again."})
+        return
+    answer = "".join(parts)
+    if on_done is not None:
+        on_done(answer)
+    yield sse_event("done", {"answer": answer})
+
+def event_stream_response(events) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,157 @@
+"""Structured, sampled, non-blocking logging.
+
+Records are put on an in-memory queue by the request path and written as
+one JSON object per line by a background listener thread, so a slow
+stdout never stalls a request. Every record carries the current request's
+correlation ID. Below WARNING, whole requests are sampled in or out by
+their ID (LOG_SAMPLE_RATE) so a sampled request keeps all of its lines.
+Large bodies are never logged; use `payload_summary()` instead.
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_request_id = ContextVar("request_id", default=None)
+_listener = None
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+def new_request_id(value=None) -> str:
+    """Set the correlation ID for the current request (a client-supplied one, or a new one)"""
+    request_id = (value or uuid.uuid4().hex[:16])[:64]
+    _request_id.set(request_id)
+    return request_id
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+def payload_summary(data, size_bytes=None, max_keys=12) -> dict:
+    """Size-bounded description of a JSON body: byte size, top-level keys and list lengths"""
+    summary = {"bytes": size_bytes}
+    if isinstance(data, dict):
+        keys = list(data)[:max_keys]
+        summary["keys"] = keys
+        counts = {}
+        for key in keys:
+            value = data[key]
+            if isinstance(value, dict):
+                value = value.get("data", value)
+            if isinstance(value, (list, dict)):
+                counts[key] = len(value)
+        summary["counts"] = counts
+    elif isinstance(data, list):
+        summary["items"] = len(data)
+    return summary
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamp each record with the request ID and drop unsampled low-severity records"""
+
+    def __init__(self, sample_rate=1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        if record.levelno >= logging.WARNING or self.sample_rate >= 1.0:
+            return True
+        key = record.request_id or f"{record.name}:{record.created}"
+        return zlib.crc32(key.encode()) / 0xFFFFFFFF < self.sample_rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request ID, message and extra fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text  # rendered by the queue handler
+        return json.dumps(entry, default=str)
+
+
+_TRACEBACKS = logging.Formatter()
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never block the caller: when the queue is full the record is dropped"""
+
+    def prepare(self, record):
+        """Merge args into msg and render the traceback to exc_text before the record crosses threads.
+
+        The stock prepare() folds the traceback into msg and clears exc_info
+        and exc_text, so JsonFormatter could never emit "exc".
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _TRACEBACKS.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def setup_logging(level=LOG_LEVEL, sample_rate=LOG_SAMPLE_RATE, stream=None):
+    """Route the `lms` loggers through a background queue listener; safe to call twice"""
+    global _listener
+    logger = logging.getLogger("lms")
+    logger.setLevel(level)
+    if _listener is not None:
+        return logger
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = _DroppingQueueHandler(log_queue)
+    handler.addFilter(CorrelationFilter(sample_rate))
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    logger = logging.getLogger("lms")
+    for handler in list(logger.handlers):
+        if isinstance(handler, _DroppingQueueHandler):
+            logger.removeHandler(handler)
@@ -0,0 +1,63 @@
+from student_model import decode_sections
+
+
+class StudentContext:
+    """A fetched profile plus everything derived from it once at fetch time.
+
+    `model` is the parsed StudentModel, `index` maps a section name to a
+    one-line summary and `records` holds the flattened context records, so
+    each question only has to rank and pack records instead of re-walking
+    the raw JSON. `validators` (ETag / Last-Modified) and `section_hashes`
+    let the next refresh skip or limit the rebuild when little changed.
+    `raw_sections` keeps each payload section as compact JSON bytes for the
+    JSON agent, which browses fields the model does not carry. `degraded`
+    holds the LMS error when this is the last good copy served because a
+    refresh failed; such a context must not be re-cached as fresh.
+    """
+    __slots__ = ("student_id", "model", "summary", "index", "records", "error",
+                 "validators", "section_hashes", "raw_sections", "degraded")
+
+    def __init__(self, student_id, model=None, summary=None, index=None, records=None, error=None,
+                 validators=None, section_hashes=None, raw_sections=None, degraded=None):
+        self.student_id = student_id
+        self.model = model
+        self.summary = summary if summary is not None else {}
+        self.index = index if index is not None else {}
+        self.records = records if records is not None else []
+        self.error = error
+        self.validators = validators if validators is not None else {}
+        self.section_hashes = section_hashes if section_hashes is not None else {}
+        self.raw_sections = raw_sections if raw_sections is not None else {}
+        self.degraded = degraded
+
+    @property
+    def is_fresh(self) -> bool:
+        """Loaded (or confirmed unchanged) from the LMS just now, so worth caching"""
+        return self.error is None and self.degraded is None
+
+    def raw_profile(self) -> dict:
+        """The payload as the LMS sent it, decoded on demand"""
+        return decode_sections(self.raw_sections)
+
+
+def build_context_index(model, summary) -> dict:
+    """Precompute a one-line summary per section for one student"""
+    profile = model.profile
+    return {
+        "profile": " | ".join([
+            f"Student: {summary.get('name', 'N/A')}",
+            f"Course: {summary.get('course', 'N/A')}",
+            f"Batch: {summary.get('batch', 'N/A')}",
+            f"Branch: {(profile and profile.branch_name) or 'N/A'}",
+            f"Email: {(profile and profile.email) or 'N/A'}",
+            f"City: {(profile and profile.city) or 'N/A'}",
+        ]),
+        "quizzes": f"Quiz Performance: {summary.get('quizzes', 'No quiz data')}",
+        "assignments": f"Assignments: {summary.get('assignments', 'No assignment data')}",
+        "fees": f"Fee Status: {summary.get('fees', 'No fee data')}",
+        "lectures": (f"Lecture Notes: {len(model.lecture_notes)}, "
+                     f"Video Tutorials: {len(model.video_tutorials)}"),
+        "announcements": f"Announcements: {len(model.announcements)}",
+        "news": f"News: {len(model.news)}",
+        "help_support": f"Support Tickets: {len(model.help_support)}",
+    }
@@ -0,0 +1,313 @@
+"""Typed, compact student profile parsed once per fetch.
+
+The LMS payload is nested dicts of strings. Every endpoint used to walk it
+again with chains of .get() and re-parse marks with isdigit(). Parsing it
+once into slotted dataclasses, with dates and marks already converted and
+the common aggregates precomputed, makes each request a few attribute
+reads. The model is also what the profile cache stores.
+"""
+import hashlib
+import json
+import re
+import zlib
+from dataclasses import dataclass, replace
+from datetime import date
+
+_DATE_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+
+def parse_date(value):
+    """First YYYY-MM-DD in a value as a date, or None"""
+    match = _DATE_RE.search(str(value or ""))
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    except ValueError:
+        return None
+
+
+def parse_number(value):
+    """Marks and amounts arrive as strings ("15", "15000.00"); None if missing or not numeric"""
+    if value is None or value == "":
+        return None
+    try:
+        number = float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _items(value):
+    if isinstance(value, dict):
+        value = value.get("data", [])
+    return [item for item in (value or []) if isinstance(item, dict)]
+
+
+# === Records ===
+@dataclass(slots=True, frozen=True)
+class Assignment:
+    title: str
+    due: date | None
+    total_marks: int | float | None
+    obtained: int | float | None
+
+    @property
+    def completed(self) -> bool:
+        return self.obtained is not None
+
+    def to_dict(self):
+        return {"add_title": self.title, "submission_date": _iso(self.due),
+                "total_marks": _text(self.total_marks), "obtain_marks": _text(self.obtained)}
+
+
+@dataclass(slots=True, frozen=True)
+class Quiz:
+    title: str
+    due: date | None
+    marks: int | float | None
+    obtained: int | float | None
+
+    @property
+    def completed(self) -> bool:
+        return self.obtained is not None
+
+    def to_dict(self):
+        return {"title": self.title, "lastDate": _iso(self.due),
+                "marks": _text(self.marks), "obtained_marks": _text(self.obtained)}
+
+
+@dataclass(slots=True, frozen=True)
+class Material:
+    """A lecture note or video tutorial"""
+    title: str
+    date: date | None
+
+    def to_dict(self):
+        return {"title": self.title, "lec_date": _iso(self.date)}
+
+
+@dataclass(slots=True, frozen=True)
+class Invoice:
+    amount: int | float | None
+    date: date | None  # receipt date when paid, due date when unpaid
+    reference: str | None
+    paid: bool
+
+    def to_dict(self):
+        if self.paid:
+            return {"fee_amount": _text(self.amount), "receipt_date": _iso(self.date), "receipt_id": self.reference}
+        return {"fee_amount": _text(self.amount), "due_date": _iso(self.date), "invoice_id": self.reference}
+
+
+@dataclass(slots=True, frozen=True)
+class Notice:
+    """An announcement, news item or help/support ticket"""
+    title: str
+    date: date | None
+
+    def to_dict(self):
+        return {"title": self.title, "date": _iso(self.date)}
+
+
+@dataclass(slots=True, frozen=True)
+class StudentProfile:
+    first_name: str
+    last_name: str
+    email: str | None
+    gender: str | None
+    date_of_birth: date | None
+    city: str | None
+    course_name: str | None
+    batch_name: str | None
+    branch_name: str | None
+
+    @property
+    def name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+    def to_dict(self):
+        return {"first_name": self.first_name, "last_name": self.last_name, "email": self.email,
+                "gender": self.gender, "date_of_birth": _iso(self.date_of_birth), "city": self.city,
+                "course_name": self.course_name, "batch_name": self.batch_name,
+                "branch_name": self.branch_name}
+
+
+@dataclass(slots=True, frozen=True)
+class StudentModel:
+    profile: StudentProfile | None
+    assignments: tuple
+    quizzes: tuple
+    lecture_notes: tuple
+    video_tutorials: tuple
+    paid_invoices: tuple
+    unpaid_invoices: tuple
+    announcements: tuple
+    news: tuple
+    help_support: tuple
+
+    # Aggregates, computed once in parse_profile
+    assignments_total: int
+    assignments_completed: int
+    quizzes_total: int
+    quizzes_completed: int
+    quiz_average: float | None
+    paid_count: int
+    unpaid_count: int
+    unpaid_amount: int | float
+
+    @property
+    def assignments_pending(self) -> int:
+        return self.assignments_total - self.assignments_completed
+
+    @property
+    def pending_assignments(self):
+        return [a for a in self.assignments if not a.completed]
+
+    @property
+    def completed_quizzes(self):
+        return [q for q in self.quizzes if q.completed]
+
+    def fee_invoices_dict(self) -> dict:
+        return {
+            "paid_invoices": {"total": self.paid_count, "paid": [i.to_dict() for i in self.paid_invoices]},
+            "unpaid_invoices": {"total": self.unpaid_count, "unpaid": [i.to_dict() for i in self.unpaid_invoices]},
+        }
+
+
+def _notices(value):
+    notices = []
+    for item in _items(value):
+        title = item.get("title") or item.get("subject") or item.get("description")
+        if title:
+            notices.append(Notice(str(title), parse_date(item.get("date") or item.get("created_at"))))
+    return tuple(notices)
+
+
+# === Parsing ===
+# One parser per top-level payload section, each returning the StudentModel
+# fields derived from it, so a refresh can re-parse only the sections that changed.
+
+def _parse_profile_section(raw_profile):
+    raw_profile = raw_profile or {}
+    if not raw_profile:
+        return {"profile": None}
+    return {"profile": StudentProfile(
+        first_name=raw_profile.get("first_name", "") or "",
+        last_name=raw_profile.get("last_name", "") or "",
+        email=raw_profile.get("email"),
+        gender=raw_profile.get("gender"),
+        date_of_birth=parse_date(raw_profile.get("date_of_birth")),
+        city=raw_profile.get("city"),
+        course_name=raw_profile.get("course_name"),
+        batch_name=raw_profile.get("batch_name"),
+        branch_name=raw_profile.get("branch_name"),
+    )}
+
+
+def _parse_lms_section(lms):
+    lms = lms or {}
+    raw_assignments = lms.get("assignments") or {}
+    assignments = tuple(
+        Assignment(str(a.get("add_title")), parse_date(a.get("submission_date")),
+                   parse_number(a.get("total_marks")), parse_number(a.get("obtain_marks")))
+        for a in _items(raw_assignments)
+    )
+    raw_quizzes = lms.get("quizzes") or {}
+    quizzes = tuple(
+        Quiz(str(q.get("title")), parse_date(q.get("lastDate")),
+             parse_number(q.get("marks")), parse_number(q.get("obtained_marks")))
+        for q in _items(raw_quizzes)
+    )
+    notes = tuple(Material(str(n.get("lec_title")), parse_date(n.get("lec_date")))
+                  for n in _items(lms.get("lecture_notes")))
+    videos = tuple(Material(str(v.get("video_title")), parse_date(v.get("lec_date")))
+                   for v in _items(lms.get("video_tutorials")))
+
+    scores = [q.obtained for q in quizzes if q.obtained is not None]
+    return {
+        "assignments": assignments,
+        "quizzes": quizzes,
+        "lecture_notes": notes,
+        "video_tutorials": videos,
+        "assignments_total": raw_assignments.get("count", len(assignments)),
+        "assignments_completed": sum(1 for a in assignments if a.completed),
+        "quizzes_total": raw_quizzes.get("count", len(quizzes)),
+        "quizzes_completed": sum(1 for q in quizzes if q.completed),
+        "quiz_average": sum(scores) / len(scores) if scores else None,
+    }
+
+
+def _parse_fees_section(fees):
+    fees = fees or {}
+    raw_paid = fees.get("paid_invoices") or {}
+    raw_unpaid = fees.get("unpaid_invoices") or {}
+    paid = tuple(Invoice(parse_number(f.get("fee_amount")), parse_date(f.get("receipt_date")),
+                         _text(f.get("receipt_id")), True) for f in raw_paid.get("paid", []) or [])
+    unpaid = tuple(Invoice(parse_number(f.get("fee_amount")), parse_date(f.get("due_date")),
+                           _text(f.get("invoice_id")), False) for f in raw_unpaid.get("unpaid", []) or [])
+    return {
+        "paid_invoices": paid,
+        "unpaid_invoices": unpaid,
+        "paid_count": raw_paid.get("total", len(paid)),
+        "unpaid_count": raw_unpaid.get("total", len(unpaid)),
+        "unpaid_amount": sum(i.amount or 0 for i in unpaid),
+    }
+
+
+# Top-level payload section -> parser
+SECTION_PARSERS = {
+    "profile": _parse_profile_section,
+    "lms": _parse_lms_section,
+    "fee_invoices": _parse_fees_section,
+    "announcements": lambda value: {"announcements": _notices(value)},
+    "news": lambda value: {"news": _notices(value)},
+    "help_support": lambda value: {"help_support": _notices(value)},
+}
+
+
+def parse_profile(student_data) -> StudentModel:
+    """Parse one raw `student-profile` payload into a StudentModel"""
+    fields = {}
+    for section, parser in SECTION_PARSERS.items():
+        fields.update(parser(student_data.get(section)))
+    return StudentModel(**fields)
+
+
+def update_model(model, student_data, sections) -> StudentModel:
+    """Copy of `model` with only the given top-level `sections` re-parsed from `student_data`"""
+    fields = {}
+    for section in sections:
+        fields.update(SECTION_PARSERS[section](student_data.get(section)))
+    return replace(model, **fields) if fields else model
+
+
+def encode_sections(student_data) -> dict:
+    """Each top-level payload section, exactly as the LMS sent it, as zlib-compressed compact JSON"""
+    return {
+        section: zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode())
+        for section, value in student_data.items()
+    }
+
+
+def decode_sections(encoded) -> dict:
+    return {section: json.loads(zlib.decompress(data)) for section, data in encoded.items()}
+
+
+_MISSING = zlib.compress(b"null")
+
+
+def section_hashes(encoded) -> dict:
+    """Content hash of each parsed section (from encode_sections), to tell which ones changed"""
+    return {
+        section: hashlib.blake2b(encoded.get(section, _MISSING), digest_size=16).hexdigest()
+        for section in SECTION_PARSERS
+    }